@@ -1,8 +1,8 @@
-import os
+from concurrent.futures import ThreadPoolExecutor
 
 import streamlit as st
 
-from config import Config
+from config import Config, ensure_dirs
 from logger import get_logger
 from services import ai_service, report_service
 
@@ -12,6 +12,41 @@ logger = get_logger(__name__)
 # --- Configuração da Página e Inicialização ---
 st.set_page_config(layout="wide", page_title="AI Essay Grader", page_icon="✍️")
 
+
+@st.cache_resource(show_spinner=False)
+def inicializar_ia() -> bool:
+    """Configura a API do Gemini uma única vez por processo (cache do Streamlit)."""
+    ai_service.configurar_ia()
+    return True
+
+
+@st.cache_data(show_spinner=False)
+def carregar_prompt_mestre(caminho_prompt: str = Config.PROMPT_PATH) -> str:
+    """Carrega o prompt mestre uma única vez por processo (cache do Streamlit)."""
+    return ai_service.carregar_prompt(caminho_prompt)
+
+
+@st.cache_resource(show_spinner=False)
+def executor_relatorios() -> ThreadPoolExecutor:
+    """Executor compartilhado para gerar relatórios fora da thread do script."""
+    return ThreadPoolExecutor(max_workers=1)
+
+
+@st.cache_data(ttl=3600, max_entries=64, show_spinner=False)
+def analisar_redacao_cacheada(imagem_bytes: bytes, mime_type: str, prompt: str):
+    """
+    Análise com cache por conteúdo: reenvios da mesma imagem (duplo clique,
+    recarga da página) retornam na hora, sem nova chamada à API.
+
+    Falhas viram exceção em vez de retorno None: o st.cache_data não
+    cacheia exceções, então um erro transitório (cota, rede) não gruda no
+    cache e a próxima tentativa chama a API de novo.
+    """
+    dados = ai_service.analisar_redacao(imagem_bytes, mime_type, prompt)
+    if dados is None:
+        raise RuntimeError("Análise da redação falhou (detalhes nos logs).")
+    return dados
+
 st.title("✍️ AI Essay Grader")
 st.markdown(
     "Faça o upload da foto de uma redação manuscrita para receber uma análise completa e precisa."
@@ -20,15 +55,14 @@ st.divider()
 
 # --- Inicialização do Sistema (IA e Configurações) ---
 try:
-    # Configura a API do Gemini
-    ai_service.configurar_ia()
+    # Garante os diretórios de trabalho (uma única vez por processo)
+    ensure_dirs()
 
-    # Carrega o prompt (usando cache de sessão se possível)
-    if "prompt_mestre" not in st.session_state:
-        st.session_state["prompt_mestre"] = ai_service.carregar_prompt()
-        logger.info("Prompt carregado e armazenado na sessão.")
+    # Configura a API do Gemini
+    inicializar_ia()
 
-    PROMPT_MESTRE = st.session_state["prompt_mestre"]
+    # Carrega o prompt (cache global do processo, compartilhado entre sessões)
+    PROMPT_MESTRE = carregar_prompt_mestre()
 
 except Exception as e:
     logger.critical(f"Erro Crítico na Inicialização: {e}")
@@ -41,42 +75,30 @@ imagem_redacao = st.file_uploader(
 )
 
 if imagem_redacao is not None:
-    # Utiliza o diretório temporário definido na configuração
-    temp_dir = Config.TEMP_UPLOADS_DIR
-
-    # Define o caminho completo
-    caminho_imagem_temp = os.path.join(temp_dir, imagem_redacao.name)
-
-    try:
-        with open(caminho_imagem_temp, "wb") as f:
-            f.write(imagem_redacao.getbuffer())
-        logger.info(f"Imagem recebida e salva em: {caminho_imagem_temp}")
-    except Exception as e:
-        logger.error(f"Falha ao salvar imagem temporária: {e}")
-        st.error("Falha ao processar o upload da imagem.")
-        st.stop()
-
     if st.button("Analisar Redação com IA", type="primary", use_container_width=True):
         dados_redacao = None
 
         with st.spinner("Analisando a imagem e corrigindo a redação..."):
             try:
-                dados_redacao = ai_service.analisar_redacao(
-                    caminho_imagem_temp, PROMPT_MESTRE
+                # Envia os bytes do upload diretamente, sem passar pelo disco
+                dados_redacao = analisar_redacao_cacheada(
+                    imagem_redacao.getvalue(), imagem_redacao.type, PROMPT_MESTRE
                 )
+            except RuntimeError:
+                # Falha já logada pelo serviço; a mensagem padrão abaixo
+                # ("Não foi possível analisar...") orienta o usuário
+                dados_redacao = None
             except Exception as e:
                 logger.error(f"Exceção não tratada durante a análise: {e}")
                 st.error("Ocorreu um erro inesperado durante a análise.")
 
-        # Tenta remover o arquivo temporário após o uso
-        try:
-            if os.path.exists(caminho_imagem_temp):
-                os.remove(caminho_imagem_temp)
-                logger.info(f"Arquivo temporário removido: {caminho_imagem_temp}")
-        except OSError as e:
-            logger.warning(f"Não foi possível remover o arquivo temporário: {e}")
-
         if dados_redacao:
+            # Dispara a geração do DOCX em segundo plano: o render dos
+            # resultados abaixo acontece enquanto o relatório é montado
+            docx_future = executor_relatorios().submit(
+                report_service.preencher_e_gerar_docx, dados_redacao
+            )
+
             st.success("Análise concluída com sucesso!", icon="🎉")
 
             nome_aluno = dados_redacao.get("nome_aluno", "Aluno")
@@ -91,11 +113,9 @@ if imagem_redacao is not None:
             with st.expander("Ver Comentários Gerais"):
                 st.markdown(dados_redacao.get("comentarios_gerais", ""))
 
-            # Geração do Arquivo DOCX
+            # Geração do Arquivo DOCX (aguarda o trabalho em segundo plano)
             try:
-                arquivo_docx_bytes = report_service.preencher_e_gerar_docx(
-                    dados_redacao
-                )
+                arquivo_docx_bytes = docx_future.result()
 
                 if arquivo_docx_bytes:
                     nome_aluno_formatado = nome_aluno.replace(" ", "_")
@@ -1,43 +1,52 @@
+import functools
 import os
+from pathlib import Path
 
 from dotenv import load_dotenv
 
-# Carrega variáveis de ambiente do arquivo .env, se existir
-load_dotenv()
+# Carrega variáveis de ambiente do arquivo .env, se existir. Sob pytest ou
+# com CONFIG_NO_DOTENV definido, pula a busca pelo arquivo: o ambiente já
+# vem montado e o stat/parse do .env seria só custo de import
+if not os.getenv("PYTEST_CURRENT_TEST") and not os.getenv("CONFIG_NO_DOTENV"):
+    load_dotenv()
+
+# Base do projeto resolvida uma única vez no import (um único resolve(),
+# em vez de abspath/dirname encadeados); os demais caminhos derivam dela
+_BASE_DIR = Path(__file__).resolve().parent
 
 
 class Config:
     # Caminhos Base
-    BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-    ASSETS_DIR = os.path.join(BASE_DIR, "assets")
-    SECRETS_DIR = os.path.join(BASE_DIR, "secrets")
+    BASE_DIR = _BASE_DIR
+    ASSETS_DIR = _BASE_DIR / "assets"
+    SECRETS_DIR = _BASE_DIR / "secrets"
 
     # Arquivos de Credenciais
-    GOOGLE_CREDENTIALS_PATH = os.path.join(
-        SECRETS_DIR, os.getenv("GOOGLE_CREDENTIALS_FILE", "google-credentials.json")
-    )
-    DRIVE_CREDENTIALS_PATH = os.path.join(
-        SECRETS_DIR, os.getenv("DRIVE_CREDENTIALS_FILE", "credentials.json")
+    GOOGLE_CREDENTIALS_PATH = SECRETS_DIR / os.getenv(
+        "GOOGLE_CREDENTIALS_FILE", "google-credentials.json"
     )
-    DRIVE_TOKEN_PATH = os.path.join(
-        SECRETS_DIR, os.getenv("DRIVE_TOKEN_FILE", "token.json")
+    DRIVE_CREDENTIALS_PATH = SECRETS_DIR / os.getenv(
+        "DRIVE_CREDENTIALS_FILE", "credentials.json"
     )
+    DRIVE_TOKEN_PATH = SECRETS_DIR / os.getenv("DRIVE_TOKEN_FILE", "token.json")
 
     # Arquivos de Recursos
-    TEMPLATE_DOCX_PATH = os.path.join(
-        ASSETS_DIR, os.getenv("TEMPLATE_DOCX_FILE", "template.docx")
-    )
-    PROMPT_PATH = os.path.join(ASSETS_DIR, os.getenv("PROMPT_FILE", "prompt.txt"))
+    TEMPLATE_DOCX_PATH = ASSETS_DIR / os.getenv("TEMPLATE_DOCX_FILE", "template.docx")
+    PROMPT_PATH = ASSETS_DIR / os.getenv("PROMPT_FILE", "prompt.txt")
 
     # Diretórios Temporários
-    TEMP_UPLOADS_DIR = os.path.join(
-        BASE_DIR, os.getenv("TEMP_UPLOADS_DIR", "temp_uploads")
-    )
-    TEMP_LOTE_DIR = os.path.join(BASE_DIR, os.getenv("TEMP_LOTE_DIR", "temp_lote"))
+    TEMP_UPLOADS_DIR = _BASE_DIR / os.getenv("TEMP_UPLOADS_DIR", "temp_uploads")
+    TEMP_LOTE_DIR = _BASE_DIR / os.getenv("TEMP_LOTE_DIR", "temp_lote")
+
+    # Cache persistente de análises da IA
+    CACHE_ANALISES_DIR = _BASE_DIR / os.getenv("CACHE_ANALISES_DIR", "cache_analises")
 
     # Configurações da IA
     MODEL_NAME = os.getenv("GEMINI_MODEL_NAME", "gemini-2.0-flash")
 
+    # Qualidade da recompressão JPEG antes do envio à IA (1 a 95)
+    JPEG_QUALITY = int(os.getenv("JPEG_QUALITY", "85"))
+
     # Configurações do Google Drive (Correção em Lote)
     DRIVE_FOLDER_INPUT_ID = os.getenv(
         "DRIVE_FOLDER_INPUT_ID", "1c_8ybbo6HAhMxlOeNKX71PPF8TfySKx-"
@@ -47,7 +56,18 @@ class Config:
     )
 
 
-# Criação dos diretórios necessários se não existirem
-os.makedirs(Config.TEMP_UPLOADS_DIR, exist_ok=True)
-os.makedirs(Config.TEMP_LOTE_DIR, exist_ok=True)
-os.makedirs(Config.SECRETS_DIR, exist_ok=True)
+@functools.lru_cache(maxsize=1)
+def ensure_dirs() -> None:
+    """
+    Cria (uma única vez por processo) os diretórios de trabalho.
+
+    Chamada pelos pontos de entrada em vez de rodar no import: módulos que
+    apenas leem o Config não pagam os stat/mkdir a cada import.
+    """
+    for caminho in (
+        Config.TEMP_UPLOADS_DIR,
+        Config.TEMP_LOTE_DIR,
+        Config.CACHE_ANALISES_DIR,
+        Config.SECRETS_DIR,
+    ):
+        caminho.mkdir(parents=True, exist_ok=True)
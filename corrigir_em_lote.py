@@ -1,26 +1,95 @@
-import os
+import io
+import mimetypes
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
-from config import Config
+from config import Config, ensure_dirs
 from logger import get_logger
 from services import ai_service, report_service
-from services.drive_service import GoogleDriveService
+from services.drive_service import get_drive_service
 
 # --- Configuração de Logs ---
 logger = get_logger(__name__)
 
+# Redações processadas em paralelo: cada uma é dominada por latência de
+# rede (download, Gemini, upload), então sobrepor as etapas reduz o tempo
+# total do lote sem estourar a cota de requisições da API
+MAX_PROCESSAMENTOS_SIMULTANEOS = 4
+
+
+def processar_item(drive_service, prompt_mestre: str, item: dict) -> bool:
+    """
+    Processa uma única redação: download, análise da IA, geração do DOCX
+    e upload do resultado. Retorna True em caso de sucesso.
+    """
+    file_id = item["id"]
+    file_name = item["name"]
+
+    logger.info(f"--- Processando: {file_name} (ID: {file_id}) ---")
+
+    try:
+        # Download da imagem (em bytes)
+        file_content = drive_service.download_file(file_id)
+
+        if not file_content:
+            logger.warning(f"Falha ao baixar o arquivo '{file_name}'. Pulando.")
+            return False
+
+        # Análise da IA direto dos bytes baixados (sem passar pelo disco)
+        mime_type = mimetypes.guess_type(file_name)[0] or "image/jpeg"
+        dados_redacao = ai_service.analisar_redacao(
+            file_content, mime_type, prompt_mestre
+        )
+
+        if not dados_redacao:
+            logger.warning(
+                f"Falha na análise da IA para o arquivo '{file_name}'. Pulando."
+            )
+            return False
+
+        # Geração do DOCX
+        arquivo_docx_bytes = report_service.preencher_e_gerar_docx(dados_redacao)
+
+        if not arquivo_docx_bytes:
+            logger.warning(
+                f"Falha ao gerar o arquivo .docx para '{file_name}'. Pulando."
+            )
+            return False
+
+        # Upload do Resultado
+        nome_aluno = (
+            dados_redacao.get("nome_aluno", "Aluno").strip().replace(" ", "_")
+        )
+        # Adiciona parte do ID para garantir unicidade
+        nome_arquivo_final = f"Correcao_{nome_aluno}_{file_id[:4]}.docx"
+
+        novo_id = drive_service.upload_docx(
+            io.BytesIO(arquivo_docx_bytes),
+            nome_arquivo_final,
+            Config.DRIVE_FOLDER_OUTPUT_ID,
+        )
+
+        if novo_id:
+            logger.info(f"Sucesso! Relatório salvo. ID: {novo_id}")
+            return True
+
+        logger.error(f"Falha ao fazer upload do relatório para '{file_name}'.")
+        return False
+
+    except Exception as e:
+        logger.error(f"Erro ao processar o arquivo '{file_name}': {e}")
+        return False
+
 
 def main():
     logger.info("Iniciando assistente de correção em lote...")
 
-    # Garante que o diretório temporário exista
-    os.makedirs(Config.TEMP_LOTE_DIR, exist_ok=True)
-
     try:
         # --- 1. CONFIGURAÇÃO INICIAL ---
+        ensure_dirs()
         ai_service.configurar_ia()
 
-        # Inicializa o serviço do Drive (já trata autenticação internamente)
-        drive_service = GoogleDriveService()
+        # Obtém o serviço do Drive (já trata autenticação internamente)
+        drive_service = get_drive_service()
         logger.info("Serviços de IA e Google Drive inicializados.")
 
         prompt_mestre = ai_service.carregar_prompt()
@@ -38,80 +107,19 @@ def main():
 
         logger.info(f"Encontradas {len(items)} redações para corrigir.")
 
-        # --- 3. PROCESSAMENTO ---
-        for item in items:
-            file_id = item["id"]
-            file_name = item["name"]
-
-            logger.info(f"--- Processando: {file_name} (ID: {file_id}) ---")
-
-            caminho_imagem_temp = os.path.join(Config.TEMP_LOTE_DIR, file_name)
-
-            try:
-                # Download da imagem (em bytes)
-                file_content = drive_service.download_file(file_id)
-
-                if not file_content:
-                    logger.warning(f"Falha ao baixar o arquivo '{file_name}'. Pulando.")
-                    continue
-
-                # Salva temporariamente para a IA processar
-                # (O ai_service atualmente espera um caminho de arquivo)
-                with open(caminho_imagem_temp, "wb") as f:
-                    f.write(file_content)
-
-                # Análise da IA
-                dados_redacao = ai_service.analisar_redacao(
-                    caminho_imagem_temp, prompt_mestre
-                )
-
-                if not dados_redacao:
-                    logger.warning(
-                        f"Falha na análise da IA para o arquivo '{file_name}'. Pulando."
-                    )
-                    continue
-
-                # Geração do DOCX
-                arquivo_docx_bytes = report_service.preencher_e_gerar_docx(
-                    dados_redacao
-                )
-
-                if not arquivo_docx_bytes:
-                    logger.warning(
-                        f"Falha ao gerar o arquivo .docx para '{file_name}'. Pulando."
-                    )
-                    continue
-
-                # Upload do Resultado
-                nome_aluno = (
-                    dados_redacao.get("nome_aluno", "Aluno").strip().replace(" ", "_")
-                )
-                # Adiciona parte do ID para garantir unicidade
-                nome_arquivo_final = f"Correcao_{nome_aluno}_{file_id[:4]}.docx"
-
-                folder_output_id = Config.DRIVE_FOLDER_OUTPUT_ID
-
-                novo_id = drive_service.upload_docx(
-                    arquivo_docx_bytes, nome_arquivo_final, folder_output_id
-                )
-
-                if novo_id:
-                    logger.info(f"Sucesso! Relatório salvo. ID: {novo_id}")
-                else:
-                    logger.error(
-                        f"Falha ao fazer upload do relatório para '{file_name}'."
-                    )
-
-            except Exception as e:
-                logger.error(f"Erro ao processar o arquivo '{file_name}': {e}")
-
-            finally:
-                # Limpeza do arquivo temporário
-                if os.path.exists(caminho_imagem_temp):
-                    try:
-                        os.remove(caminho_imagem_temp)
-                    except OSError:
-                        pass
+        # --- 3. PROCESSAMENTO (em paralelo) ---
+        with ThreadPoolExecutor(
+            max_workers=MAX_PROCESSAMENTOS_SIMULTANEOS
+        ) as executor:
+            futuros = [
+                executor.submit(processar_item, drive_service, prompt_mestre, item)
+                for item in items
+            ]
+            sucessos = sum(1 for futuro in as_completed(futuros) if futuro.result())
+
+        logger.info(
+            f"Lote concluído: {sucessos}/{len(items)} redações corrigidas com sucesso."
+        )
 
     except Exception as e:
         logger.critical(f"Ocorreu um erro fatal na execução do script: {e}")
@@ -0,0 +1,74 @@
+import re
+
+from docx import Document
+
+from config import Config
+from logger import get_logger
+
+logger = get_logger(__name__)
+
+# Padrões compilados uma única vez, escritos sem '.*?' (usam classes de
+# caracteres negadas), garantindo varredura em tempo linear mesmo em
+# parágrafos longos ou malformados.
+PLACEHOLDERS_REGEX = re.compile(r"\{\{[^{}]+\}\}")
+# Aplicado ao texto JÁ SEM os placeholders bem formados: qualquer '{{' ou
+# '}}' restante é artefato; o \w* captura o pedaço de nome grudado na
+# chave (ex: 'NOTA_C1}}') para o log apontar qual placeholder quebrou
+ARTEFATOS_REGEX = re.compile(r"\{\{\w*|\w*\}\}")
+
+
+def _iter_textos(document: Document):
+    """Itera preguiçosamente pelos textos de parágrafos do corpo e tabelas."""
+    for paragrafo in document.paragraphs:
+        yield paragrafo.text
+    for tabela in document.tables:
+        for linha in tabela.rows:
+            for celula in linha.cells:
+                for paragrafo in celula.paragraphs:
+                    yield paragrafo.text
+
+
+def analisar_template(caminho_template: str = Config.TEMPLATE_DOCX_PATH) -> bool:
+    """
+    Analisa o template .docx e reporta os placeholders encontrados.
+
+    Aponta também artefatos suspeitos (chaves desbalanceadas), que costumam
+    indicar placeholders quebrados em múltiplos 'runs' pelo Word.
+
+    Returns:
+        bool: True se nenhum artefato suspeito foi encontrado.
+    """
+    logger.info(f"Analisando template: {caminho_template}")
+    document = Document(caminho_template)
+
+    placeholders = []
+    artefatos = []
+    for texto in _iter_textos(document):
+        placeholders.extend(PLACEHOLDERS_REGEX.findall(texto))
+        if "{" in texto or "}" in texto:
+            # Remove os placeholders íntegros antes de procurar artefatos:
+            # as chaves desbalanceadas que sobram (ex: 'NOTA_C1}}' após o
+            # Word perder o '{{') são todas suspeitas
+            resto = PLACEHOLDERS_REGEX.sub("", texto)
+            artefatos.extend(ARTEFATOS_REGEX.findall(resto))
+
+    logger.info(f"Placeholders encontrados ({len(set(placeholders))} distintos):")
+    for nome in sorted(set(placeholders)):
+        logger.info(f"  - {nome}")
+
+    if artefatos:
+        logger.warning("Possíveis placeholders quebrados (chaves desbalanceadas):")
+        for artefato in artefatos:
+            logger.warning(f"  - {artefato!r}")
+        return False
+
+    logger.info("Nenhum artefato suspeito encontrado no template.")
+    return True
+
+
+if __name__ == "__main__":
+    ok = analisar_template()
+    if ok:
+        print("\n✅ Template íntegro: todos os placeholders estão bem formados.")
+    else:
+        print("\n❌ Foram encontrados artefatos suspeitos. Verifique os logs acima.")
@@ -0,0 +1,96 @@
+from docx import Document
+from docx.oxml.ns import qn
+from lxml import etree
+
+from config import Config
+from logger import get_logger
+
+logger = get_logger(__name__)
+
+_W_P = qn("w:p")
+_W_R = qn("w:r")
+_W_T = qn("w:t")
+_W_RPR = qn("w:rPr")
+_XML_SPACE = "{http://www.w3.org/XML/1998/namespace}space"
+
+
+def _assinatura_formato(run) -> bytes:
+    """Serializa o w:rPr do run (vazio se ausente) para comparação."""
+    rpr = run.find(_W_RPR)
+    return etree.tostring(rpr) if rpr is not None else b""
+
+
+def _no_texto_simples(run):
+    """
+    Retorna o único nó w:t do run, ou None se o run tiver outros filhos
+    relevantes (quebras, tabs, desenhos) que impediriam a fusão.
+    """
+    filhos = [f for f in run if f.tag != _W_RPR]
+    if len(filhos) == 1 and filhos[0].tag == _W_T:
+        return filhos[0]
+    return None
+
+
+def normalizar_template(caminho_template: str = Config.TEMPLATE_DOCX_PATH) -> int:
+    """
+    Funde runs adjacentes com formatação idêntica em cada parágrafo do
+    template, salvando o arquivo no lugar.
+
+    O Word fragmenta o texto em runs por motivos de edição (correção
+    ortográfica, histórico), o que quebra placeholders como {{NOME_ALUNO}}
+    no meio. Com o template normalizado, cada placeholder cabe em um único
+    w:t e a substituição em tempo de geração fica no caminho rápido, sem
+    remendos entre runs.
+
+    Returns:
+        int: Quantidade de runs fundidos.
+    """
+    logger.info(f"Normalizando template: {caminho_template}")
+    document = Document(caminho_template)
+
+    fundidos = 0
+    for paragrafo in document.element.iter(_W_P):
+        anterior = None
+        anterior_t = None
+        anterior_assinatura = None
+
+        for run in list(paragrafo):
+            if run.tag != _W_R:
+                # Qualquer outro elemento (hyperlink, bookmark) quebra a
+                # adjacência entre runs
+                anterior = None
+                continue
+
+            no_t = _no_texto_simples(run)
+            if no_t is None:
+                anterior = None
+                continue
+
+            assinatura = _assinatura_formato(run)
+            if anterior is not None and assinatura == anterior_assinatura:
+                # Mesmo formato do run anterior: concatena o texto e
+                # descarta o run redundante
+                anterior_t.text = (anterior_t.text or "") + (no_t.text or "")
+                anterior_t.set(_XML_SPACE, "preserve")
+                paragrafo.remove(run)
+                fundidos += 1
+            else:
+                anterior = run
+                anterior_t = no_t
+                anterior_assinatura = assinatura
+
+    if fundidos:
+        document.save(caminho_template)
+        logger.info(f"Template salvo: {fundidos} runs fundidos.")
+    else:
+        logger.info("Template já estava normalizado; nada a fazer.")
+
+    return fundidos
+
+
+if __name__ == "__main__":
+    total = normalizar_template()
+    if total:
+        print(f"\n✅ Template normalizado: {total} runs fundidos.")
+    else:
+        print("\n✅ Template já estava normalizado.")
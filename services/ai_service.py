@@ -1,15 +1,42 @@
+import functools
+import hashlib
 import json
 import os
-from typing import Any, Dict, Optional, TypedDict
-
-import google.generativeai as genai
-from PIL import Image
+import threading
+import time
+from io import BytesIO
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple, TypedDict
 
 from config import Config
 from logger import get_logger
 
+if TYPE_CHECKING:
+    import google.generativeai as genai
+
 logger = get_logger(__name__)
 
+# Parser JSON acelerado quando disponível: orjson é implementado em C e
+# suas exceções derivam de json.JSONDecodeError, então o tratamento de
+# erros existente continua valendo
+try:
+    import orjson as _json
+except ImportError:
+    _json = json
+
+# Módulo genai importado sob demanda: o import arrasta grpc/protobuf/absl
+# (centenas de ms) e não é necessário quando nenhuma análise acontece
+_genai = None
+
+
+def _importar_genai():
+    """Importa (uma única vez) o google.generativeai, que tem import pesado."""
+    global _genai
+    if _genai is None:
+        import google.generativeai as genai
+
+        _genai = genai
+    return _genai
+
 
 # --- Definição do Schema de Resposta (Tipagem Forte) ---
 class DetalheCompetencia(TypedDict):
@@ -47,8 +74,9 @@ def configurar_ia() -> None:
             logger.critical(msg)
             raise FileNotFoundError(msg)
 
-        os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = credentials_path
-        genai.configure(transport="rest")
+        # os.environ só aceita str; Config entrega caminhos como Path
+        os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = str(credentials_path)
+        _importar_genai().configure(transport="rest")
         logger.info("API Gemini configurada com sucesso.")
 
     except Exception as e:
@@ -56,6 +84,238 @@ def configurar_ia() -> None:
         raise
 
 
+@functools.lru_cache(maxsize=None)
+def _obter_modelo(model_name: str) -> "genai.GenerativeModel":
+    """
+    Constrói (uma única vez por processo) o modelo Gemini com a configuração
+    de geração que força JSON seguindo o Schema.
+
+    Args:
+        model_name (str): Nome do modelo Gemini a ser utilizado.
+
+    Returns:
+        genai.GenerativeModel: A instância do modelo, reutilizada entre chamadas.
+    """
+    genai = _importar_genai()
+    generation_config = genai.GenerationConfig(
+        response_mime_type="application/json", response_schema=CorrecaoRedacao
+    )
+    return genai.GenerativeModel(
+        model_name=model_name, generation_config=generation_config
+    )
+
+
+@functools.lru_cache(maxsize=None)
+def _obter_modelo_lote(model_name: str) -> "genai.GenerativeModel":
+    """
+    Variante do modelo com Schema de lista, para respostas contendo a
+    correção de várias redações em uma única chamada.
+
+    Args:
+        model_name (str): Nome do modelo Gemini a ser utilizado.
+
+    Returns:
+        genai.GenerativeModel: A instância do modelo, reutilizada entre chamadas.
+    """
+    genai = _importar_genai()
+    generation_config = genai.GenerationConfig(
+        response_mime_type="application/json",
+        response_schema=list[CorrecaoRedacao],
+    )
+    return genai.GenerativeModel(
+        model_name=model_name, generation_config=generation_config
+    )
+
+
+# Modelos apoiados em context caching, por (modelo, prompt), com o instante
+# de expiração local. Guarda também o resultado negativo (None) para não
+# reprovar a criação do cache a cada chamada.
+_MODELOS_COM_CONTEXTO: Dict[
+    str, Tuple[Optional["genai.GenerativeModel"], float]
+] = {}
+_contexto_lock = threading.Lock()
+
+# TTL pedido ao servidor e margem de recriação: o modelo memoizado é
+# descartado antes de o servidor apagar o cache, senão toda chamada após
+# uma hora de processo falharia até o restart
+_CONTEXTO_TTL_SEGUNDOS = 3600
+_CONTEXTO_MARGEM_SEGUNDOS = 300
+
+
+def _obter_modelo_com_contexto(
+    model_name: str, prompt: str
+) -> Optional["genai.GenerativeModel"]:
+    """
+    Tenta criar um modelo apoiado no context caching do Gemini, com o prompt
+    mestre armazenado no servidor. Assim, apenas a imagem trafega a cada
+    chamada, reduzindo latência e custo de tokens de entrada.
+
+    A entrada memoizada expira um pouco antes do TTL do servidor e é então
+    recriada; o lock garante um único cache (cobrado) por prompt mesmo com
+    os workers do lote chamando em paralelo.
+
+    Args:
+        model_name (str): Nome do modelo Gemini a ser utilizado.
+        prompt (str): Prompt mestre a ser cacheado como system_instruction.
+
+    Returns:
+        Optional[genai.GenerativeModel]: O modelo com contexto cacheado, ou
+        None se o recurso não estiver disponível (modelo/quota/prompt curto).
+    """
+    chave = f"{model_name}:{hash(prompt)}"
+    with _contexto_lock:
+        entrada = _MODELOS_COM_CONTEXTO.get(chave)
+        if entrada is not None and time.monotonic() < entrada[1]:
+            return entrada[0]
+
+        modelo = None
+        try:
+            from datetime import timedelta
+
+            from google.generativeai import caching
+
+            genai = _importar_genai()
+            cache = caching.CachedContent.create(
+                model=model_name,
+                system_instruction=prompt,
+                ttl=timedelta(seconds=_CONTEXTO_TTL_SEGUNDOS),
+            )
+            generation_config = genai.GenerationConfig(
+                response_mime_type="application/json",
+                response_schema=CorrecaoRedacao,
+            )
+            modelo = genai.GenerativeModel.from_cached_content(
+                cache, generation_config=generation_config
+            )
+            logger.info("Context caching habilitado para o prompt mestre.")
+        except Exception as e:
+            logger.warning(
+                f"Context caching indisponível ({e}); usando envio completo do prompt."
+            )
+
+        expira_em = time.monotonic() + _CONTEXTO_TTL_SEGUNDOS - _CONTEXTO_MARGEM_SEGUNDOS
+        _MODELOS_COM_CONTEXTO[chave] = (modelo, expira_em)
+        return modelo
+
+
+def _descartar_modelo_com_contexto(model_name: str, prompt: str) -> None:
+    """Descarta a entrada memoizada (ex: cache apagado antes do TTL local)."""
+    with _contexto_lock:
+        _MODELOS_COM_CONTEXTO.pop(f"{model_name}:{hash(prompt)}", None)
+
+
+# Validade das entradas do cache de análises: além de dar vazão natural a
+# entradas velhas, limita por quanto tempo um resultado sobrevive a ajustes
+# que não entram na chave
+_CACHE_ANALISES_TTL_SEGUNDOS = 7 * 24 * 3600
+
+
+def _chave_cache(imagem_bytes: bytes, prompt: str) -> str:
+    """
+    Deriva a chave do cache de análises a partir do modelo, da imagem e do
+    prompt.
+
+    Qualquer mudança no prompt mestre ou no GEMINI_MODEL_NAME invalida o
+    cache naturalmente, já que a chave deixa de coincidir.
+    """
+    h = hashlib.blake2b(digest_size=16)
+    h.update(Config.MODEL_NAME.encode("utf-8"))
+    h.update(imagem_bytes)
+    h.update(prompt.encode("utf-8"))
+    return h.hexdigest()
+
+
+def _ler_cache_analise(chave: str) -> Optional[Dict[str, Any]]:
+    """
+    Retorna a análise persistida para a chave, ou None se não houver ou se
+    a entrada tiver passado do TTL (nesse caso o arquivo é removido).
+    """
+    caminho = Config.CACHE_ANALISES_DIR / f"{chave}.json"
+    try:
+        idade = time.time() - caminho.stat().st_mtime
+        if idade > _CACHE_ANALISES_TTL_SEGUNDOS:
+            caminho.unlink(missing_ok=True)
+            return None
+        with open(caminho, "rb") as f:
+            return _json.loads(f.read())
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logger.warning(f"Cache de análise ilegível ({chave}): {e}")
+        return None
+
+
+def _gravar_cache_analise(chave: str, dados: Dict[str, Any]) -> None:
+    """Persiste a análise no cache em disco; falhas são apenas logadas."""
+    caminho = Config.CACHE_ANALISES_DIR / f"{chave}.json"
+    try:
+        with open(caminho, "w", encoding="utf-8") as f:
+            f.write(json.dumps(dados, ensure_ascii=False))
+    except Exception as e:
+        logger.warning(f"Falha ao gravar cache de análise ({chave}): {e}")
+
+
+# Lado máximo efetivamente processado pelo Gemini: pixels acima disso só
+# aumentam o upload e o custo de tokens de entrada, sem ganho de leitura
+_MAX_DIMENSAO_IMAGEM = 1568
+
+# Abaixo deste tamanho a recompressão não compensa: o ganho de upload é
+# marginal e ainda degradaria a imagem com mais uma geração de JPEG
+_LIMIAR_OTIMIZACAO_BYTES = 1024 * 1024
+
+
+def _otimizar_imagem(imagem_bytes: bytes, mime_type: str) -> Tuple[bytes, str]:
+    """
+    Reduz a imagem para a resolução efetiva do modelo e recodifica em JPEG.
+
+    Fotos de celular (ex: 4032x3024) chegam com ~4x mais pixels do que o
+    modelo consome; o downscale corta bytes de upload e tokens de entrada.
+    Imagens já pequenas (até 1 MiB) passam direto, sem pagar decode+encode.
+
+    Args:
+        imagem_bytes (bytes): Conteúdo bruto da imagem.
+        mime_type (str): Tipo MIME original.
+
+    Returns:
+        Tuple[bytes, str]: Bytes otimizados e o novo tipo MIME. Em caso de
+        falha na decodificação, retorna a imagem original inalterada.
+    """
+    if len(imagem_bytes) <= _LIMIAR_OTIMIZACAO_BYTES:
+        return imagem_bytes, mime_type
+
+    try:
+        # Import adiado: o PIL só é necessário quando há imagem para otimizar
+        from PIL import Image
+
+        img = Image.open(BytesIO(imagem_bytes))
+
+        if img.format == "JPEG":
+            # Draft mode: o libjpeg já decodifica em escala reduzida (DCT),
+            # lendo uma fração dos pixels de uma foto de 12MP. O ajuste fino
+            # restante é pequeno, então BILINEAR basta.
+            img.draft("RGB", (_MAX_DIMENSAO_IMAGEM, _MAX_DIMENSAO_IMAGEM))
+            img.thumbnail(
+                (_MAX_DIMENSAO_IMAGEM, _MAX_DIMENSAO_IMAGEM),
+                Image.Resampling.BILINEAR,
+            )
+        else:
+            img.thumbnail(
+                (_MAX_DIMENSAO_IMAGEM, _MAX_DIMENSAO_IMAGEM), Image.Resampling.LANCZOS
+            )
+        buffer = BytesIO()
+        img.convert("RGB").save(
+            buffer,
+            "JPEG",
+            quality=Config.JPEG_QUALITY,
+            optimize=True,
+            progressive=True,
+        )
+        return buffer.getvalue(), "image/jpeg"
+    except Exception as e:
+        logger.warning(f"Falha ao otimizar a imagem ({e}); enviando original.")
+        return imagem_bytes, mime_type
+
+
 def carregar_prompt(caminho_prompt: str = Config.PROMPT_PATH) -> str:
     """
     Carrega o conteúdo do arquivo de prompt.
@@ -80,52 +340,75 @@ def carregar_prompt(caminho_prompt: str = Config.PROMPT_PATH) -> str:
         raise
 
 
-def analisar_redacao(caminho_imagem: str, prompt: str) -> Optional[Dict[str, Any]]:
+def analisar_redacao(
+    imagem_bytes: bytes, mime_type: str, prompt: str
+) -> Optional[Dict[str, Any]]:
     """
-    Envia a imagem para a IA e retorna a análise estruturada.
+    Envia a imagem (em bytes) para a IA e retorna a análise estruturada.
     Utiliza o recurso 'response_schema' do Gemini para garantir JSON válido.
 
     Args:
-        caminho_imagem (str): Caminho do arquivo da imagem da redação.
+        imagem_bytes (bytes): Conteúdo bruto da imagem da redação.
+        mime_type (str): Tipo MIME da imagem (ex: 'image/jpeg').
         prompt (str): O prompt de instruções para a IA.
 
     Returns:
         Optional[Dict[str, Any]]: Um dicionário com os dados da correção ou None em caso de falha.
     """
     model_name = Config.MODEL_NAME
-    logger.info(f"Iniciando análise estruturada com o modelo: {model_name}")
 
-    try:
-        # Configuração de Geração para forçar JSON seguindo o Schema
-        generation_config = genai.GenerationConfig(
-            response_mime_type="application/json", response_schema=CorrecaoRedacao
-        )
+    # Cache persistente em disco: a mesma imagem com o mesmo prompt (lote
+    # reexecutado, reenvio do professor) não paga nova chamada ao Gemini
+    chave = _chave_cache(imagem_bytes, prompt)
+    dados_cacheados = _ler_cache_analise(chave)
+    if dados_cacheados is not None:
+        logger.info("Análise recuperada do cache em disco.")
+        return dados_cacheados
 
-        model = genai.GenerativeModel(
-            model_name=model_name, generation_config=generation_config
-        )
+    logger.info(f"Iniciando análise estruturada com o modelo: {model_name}")
 
-        # Carrega a imagem
-        if not os.path.exists(caminho_imagem):
-            logger.error(f"A imagem não foi encontrada em '{caminho_imagem}'")
-            return None
+    try:
+        # Reduz a imagem à resolução efetiva do modelo antes do envio
+        imagem_bytes, mime_type = _otimizar_imagem(imagem_bytes, mime_type)
 
-        img = Image.open(caminho_imagem)
+        # A API aceita o arquivo comprimido diretamente
+        img = {
+            "mime_type": mime_type or "image/jpeg",
+            "data": imagem_bytes,
+        }
 
-        # Gera o conteúdo
         # Prompt Adicional para reforçar a obediência ao Schema
         prompt_reforco = (
             f"{prompt}\n\n"
             "IMPORTANTE: Responda APENAS com o JSON estrito seguindo a estrutura fornecida."
         )
 
-        response = model.generate_content([prompt_reforco, img])
+        # Preferência: prompt mestre cacheado no servidor (context caching),
+        # enviando apenas a imagem por chamada. Fallback: envio completo.
+        modelo_contexto = _obter_modelo_com_contexto(model_name, prompt_reforco)
+        if modelo_contexto is not None:
+            try:
+                response = modelo_contexto.generate_content([img])
+            except Exception as e:
+                # Cache removido no servidor antes do TTL local: descarta a
+                # entrada e refaz a chamada com o prompt completo
+                logger.warning(
+                    f"Falha no modelo com contexto ({e}); "
+                    "refazendo com envio completo do prompt."
+                )
+                _descartar_modelo_com_contexto(model_name, prompt_reforco)
+                model = _obter_modelo(model_name)
+                response = model.generate_content([prompt_reforco, img])
+        else:
+            model = _obter_modelo(model_name)
+            response = model.generate_content([prompt_reforco, img])
         resposta_texto = response.text
 
         # Parse direto do JSON (agora garantido pela API)
         try:
-            dados_redacao = json.loads(resposta_texto)
+            dados_redacao = _json.loads(resposta_texto)
             logger.info("Análise concluída e JSON estruturado recebido com sucesso.")
+            _gravar_cache_analise(chave, dados_redacao)
             return dados_redacao
 
         except json.JSONDecodeError as json_err:
@@ -136,5 +419,92 @@ def analisar_redacao(caminho_imagem: str, prompt: str) -> Optional[Dict[str, Any
             return None
 
     except Exception as e:
-        logger.error(f"Ocorreu um erro na chamada da API Gemini: {e}")
+        # Erros de cota têm tipo próprio na api_core: dispatch por tipo em
+        # vez de procurar "quota" no texto da exceção. O import é local para
+        # não antecipar o carregamento do pacote google no caminho feliz.
+        from google.api_core import exceptions as gexc
+
+        if isinstance(e, (gexc.ResourceExhausted, gexc.TooManyRequests)):
+            logger.error(
+                "Cota ou limite de requisições da API Gemini atingido; "
+                "aguarde alguns instantes antes de tentar novamente."
+            )
+        else:
+            logger.error(f"Ocorreu um erro na chamada da API Gemini: {e}")
         return None
+
+
+# Redações por chamada em lote: mantém a resposta agrupada dentro do
+# orçamento de tokens de saída do modelo
+_MAX_REDACOES_POR_CHAMADA = 4
+
+
+def analisar_redacoes_lote(
+    imagens: List[Tuple[bytes, str]], prompt: str
+) -> List[Optional[Dict[str, Any]]]:
+    """
+    Analisa várias redações coalescendo-as em chamadas agrupadas ao Gemini.
+
+    A latência por chamada (rede + fila do modelo) domina o tempo de um
+    lote; enviar K imagens por requisição divide o número de round-trips
+    por K. Grupos cuja resposta agrupada falhar são reprocessados
+    individualmente, então o resultado nunca é pior do que o fluxo
+    redação a redação.
+
+    Args:
+        imagens (List[Tuple[bytes, str]]): Lista de (bytes da imagem, MIME).
+        prompt (str): O prompt de instruções para a IA.
+
+    Returns:
+        List[Optional[Dict[str, Any]]]: As correções (ou None), na mesma
+        ordem das imagens de entrada.
+    """
+    resultados: List[Optional[Dict[str, Any]]] = []
+    for inicio in range(0, len(imagens), _MAX_REDACOES_POR_CHAMADA):
+        grupo = imagens[inicio : inicio + _MAX_REDACOES_POR_CHAMADA]
+        resultados.extend(_analisar_grupo(grupo, prompt))
+    return resultados
+
+
+def _analisar_grupo(
+    grupo: List[Tuple[bytes, str]], prompt: str
+) -> List[Optional[Dict[str, Any]]]:
+    """Analisa um grupo de redações em uma chamada, com fallback individual."""
+    if len(grupo) == 1:
+        imagem_bytes, mime_type = grupo[0]
+        return [analisar_redacao(imagem_bytes, mime_type, prompt)]
+
+    try:
+        partes = []
+        for imagem_bytes, mime_type in grupo:
+            imagem_bytes, mime_type = _otimizar_imagem(imagem_bytes, mime_type)
+            partes.append(
+                {"mime_type": mime_type or "image/jpeg", "data": imagem_bytes}
+            )
+
+        prompt_lote = (
+            f"{prompt}\n\n"
+            f"IMPORTANTE: Você receberá {len(grupo)} imagens de redações, em "
+            "ordem. Responda APENAS com uma lista JSON contendo um objeto de "
+            "correção por redação, na mesma ordem das imagens."
+        )
+
+        model = _obter_modelo_lote(Config.MODEL_NAME)
+        response = model.generate_content([prompt_lote, *partes])
+        dados = _json.loads(response.text)
+
+        if isinstance(dados, list) and len(dados) == len(grupo):
+            logger.info(f"Lote de {len(grupo)} redações analisado em uma chamada.")
+            return dados
+
+        logger.warning(
+            "Resposta em lote fora do formato esperado; reprocessando "
+            "individualmente."
+        )
+    except Exception as e:
+        logger.warning(f"Falha na análise em lote ({e}); reprocessando uma a uma.")
+
+    return [
+        analisar_redacao(imagem_bytes, mime_type, prompt)
+        for imagem_bytes, mime_type in grupo
+    ]
@@ -1,8 +1,11 @@
+import functools
+import os
+import re
 from io import BytesIO
 from typing import Any, Dict, Optional
 
 from docx import Document
-from docx.text.paragraph import Paragraph
+from docx.oxml.ns import qn
 
 from config import Config
 from logger import get_logger
@@ -10,9 +13,39 @@ from logger import get_logger
 logger = get_logger(__name__)
 
 
+@functools.lru_cache(maxsize=4)
+def _carregar_template_bytes(caminho_template: str, mtime_ns: int) -> bytes:
+    """
+    Lê os bytes do template uma única vez por versão do arquivo.
+
+    O mtime na chave invalida o cache automaticamente quando o template é
+    editado; relatórios seguintes na mesma sessão pulam o I/O de disco.
+    """
+    with open(caminho_template, "rb") as f:
+        return f.read()
+
+# Tag qualificada dos nós de texto do WordprocessingML
+_W_T = qn("w:t")
+
+# (placeholder, chave nos dados, valor padrão) dos campos simples do template
+_CAMPOS_SIMPLES = (
+    ("{{NOME_ALUNO}}", "nome_aluno", "Não informado"),
+    ("{{TEMA}}", "tema_redacao", "Não informado"),
+    ("{{DATA}}", "data_redacao", "Não informada"),
+    ("{{NOTA_TOTAL}}", "nota_final", "N/A"),
+    ("{{COMENTARIOS}}", "comentarios_gerais", ""),
+)
+
+# (chave nos dados, placeholder da nota, placeholder da análise) de cada
+# competência, formatados uma única vez no carregamento do módulo
+_CAMPOS_COMPETENCIAS = tuple(
+    (f"c{i}", f"{{{{NOTA_C{i}}}}}", f"{{{{ANALISE_C{i}}}}}") for i in range(1, 6)
+)
+
+
 def preencher_e_gerar_docx(
     dados_redacao: Dict[str, Any], caminho_template: str = Config.TEMPLATE_DOCX_PATH
-) -> Optional[BytesIO]:
+) -> Optional[bytes]:
     """
     Preenche o template .docx preservando formatação e retorna o arquivo em bytes.
 
@@ -21,39 +54,28 @@ def preencher_e_gerar_docx(
         caminho_template (str): Caminho para o arquivo de template .docx.
 
     Returns:
-        Optional[BytesIO]: Buffer contendo o documento gerado ou None em caso de erro.
+        Optional[bytes]: Conteúdo do documento gerado ou None em caso de erro.
     """
     try:
         logger.info(f"Gerando DOCX usando template: {caminho_template}")
-        document = Document(caminho_template)
-
-        # Acessa os dados aninhados de forma segura
-        analise_comps = dados_redacao.get("analise_competencias", {})
-        c1 = analise_comps.get("c1", {})
-        c2 = analise_comps.get("c2", {})
-        c3 = analise_comps.get("c3", {})
-        c4 = analise_comps.get("c4", {})
-        c5 = analise_comps.get("c5", {})
+        info = os.stat(caminho_template)
+        document = Document(
+            BytesIO(_carregar_template_bytes(caminho_template, info.st_mtime_ns))
+        )
 
-        # Dicionário de substituições
+        # Dicionário de substituições montado a partir das tuplas estáticas
         substituicoes = {
-            "{{NOME_ALUNO}}": dados_redacao.get("nome_aluno", "Não informado"),
-            "{{TEMA}}": dados_redacao.get("tema_redacao", "Não informado"),
-            "{{DATA}}": dados_redacao.get("data_redacao", "Não informada"),
-            "{{NOTA_TOTAL}}": str(dados_redacao.get("nota_final", "N/A")),
-            "{{COMENTARIOS}}": dados_redacao.get("comentarios_gerais", ""),
-            "{{NOTA_C1}}": str(c1.get("nota", "N/A")),
-            "{{ANALISE_C1}}": c1.get("analise", ""),
-            "{{NOTA_C2}}": str(c2.get("nota", "N/A")),
-            "{{ANALISE_C2}}": c2.get("analise", ""),
-            "{{NOTA_C3}}": str(c3.get("nota", "N/A")),
-            "{{ANALISE_C3}}": c3.get("analise", ""),
-            "{{NOTA_C4}}": str(c4.get("nota", "N/A")),
-            "{{ANALISE_C4}}": c4.get("analise", ""),
-            "{{NOTA_C5}}": str(c5.get("nota", "N/A")),
-            "{{ANALISE_C5}}": c5.get("analise", ""),
+            placeholder: dados_redacao.get(chave, valor_padrao)
+            for placeholder, chave, valor_padrao in _CAMPOS_SIMPLES
         }
 
+        # Campos das cinco competências (nota + análise)
+        analise_comps = dados_redacao.get("analise_competencias", {})
+        for chave, ph_nota, ph_analise in _CAMPOS_COMPETENCIAS:
+            comp = analise_comps.get(chave, {})
+            substituicoes[ph_nota] = str(comp.get("nota", "N/A"))
+            substituicoes[ph_analise] = comp.get("analise", "")
+
         # Lógica para o alerta de originalidade
         alerta = dados_redacao.get("alerta_originalidade")
         if alerta:
@@ -63,24 +85,33 @@ def preencher_e_gerar_docx(
         else:
             substituicoes["{{ALERTA_ORIGINALIDADE}}"] = ""
 
-        # Substituir placeholders em parágrafos PRESERVANDO formatação
-        for paragrafo in document.paragraphs:
-            substituir_em_paragrafo(paragrafo, substituicoes)
-
-        # Substituir placeholders em tabelas PRESERVANDO formatação
-        for tabela in document.tables:
-            for linha in tabela.rows:
-                for celula in linha.cells:
-                    for paragrafo in celula.paragraphs:
-                        substituir_em_paragrafo(paragrafo, substituicoes)
-
-        # Salva o documento em um buffer de memória
+        # Garante valores já convertidos para str uma única vez, em vez de
+        # chamar str() a cada substituição dentro do laço quente
+        substituicoes = {k: str(v) for k, v in substituicoes.items()}
+
+        # Regex única de alternação: um único passe em C por texto, em vez de
+        # uma varredura Python por placeholder. Chaves mais longas primeiro:
+        # a alternação do re casa da esquerda para a direita (não o match
+        # mais longo), então prefixos sobrepostos exigem essa ordem.
+        chaves = sorted(substituicoes, key=len, reverse=True)
+        padrao = re.compile("|".join(map(re.escape, chaves)))
+
+        # Reescreve os nós de texto <w:t> diretamente via lxml (inclui corpo,
+        # tabelas e caixas de texto), sem construir os objetos Paragraph/Run
+        # do python-docx — a formatação dos runs é naturalmente preservada
+        for no_texto in document.element.iter(_W_T):
+            texto = no_texto.text
+            if texto and "{{" in texto:
+                no_texto.text = padrao.sub(
+                    lambda m: substituicoes[m.group(0)], texto
+                )
+
+        # Salva o documento em um buffer de memória e devolve apenas os bytes
         doc_buffer = BytesIO()
         document.save(doc_buffer)
-        doc_buffer.seek(0)
 
         logger.info("Arquivo DOCX gerado com sucesso.")
-        return doc_buffer
+        return doc_buffer.getvalue()
 
     except FileNotFoundError:
         logger.critical(
@@ -92,27 +123,3 @@ def preencher_e_gerar_docx(
         return None
 
 
-def substituir_em_paragrafo(
-    paragrafo: Paragraph, substituicoes: Dict[str, str]
-) -> None:
-    """
-    Substitui placeholders em um parágrafo preservando a formatação.
-
-    Args:
-        paragrafo (Paragraph): Objeto parágrafo do python-docx.
-        substituicoes (Dict[str, str]): Dicionário de chaves e valores para substituição.
-    """
-    # Verifica se há algum placeholder no texto completo do parágrafo
-    texto_completo = paragrafo.text
-
-    # Otimização: se não tem chaves de template, retorna cedo
-    if "{{" not in texto_completo:
-        return
-
-    for placeholder, valor in substituicoes.items():
-        if placeholder in texto_completo:
-            # Substitui preservando formatação dentro dos 'runs'
-            for run in paragrafo.runs:
-                if placeholder in run.text:
-                    # str(valor) garante que números sejam convertidos para string
-                    run.text = run.text.replace(placeholder, str(valor))
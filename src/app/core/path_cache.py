@@ -0,0 +1,57 @@
+import os
+import time
+from typing import Dict, Optional, Tuple
+
+# TTL curto: colapsa os acessos repetidos de um mesmo fluxo (validar,
+# carregar, limpar) sem mascarar mudanças reais no disco por muito tempo.
+_TTL_SEGUNDOS = 2.0
+
+# Limite de entradas para não crescer sem controle em lotes muito grandes
+_MAX_ENTRADAS = 1024
+
+# caminho absoluto -> (instante da consulta, resultado do stat ou None)
+_cache: Dict[str, Tuple[float, Optional[os.stat_result]]] = {}
+
+
+def stat(caminho: str) -> Optional[os.stat_result]:
+    """
+    Versão cacheada de os.stat, guardando também o resultado negativo.
+
+    Args:
+        caminho (str): Caminho do arquivo (relativo ou absoluto).
+
+    Returns:
+        Optional[os.stat_result]: Metadados do arquivo, ou None se o
+        arquivo não existir.
+    """
+    caminho = os.path.abspath(caminho)
+    agora = time.monotonic()
+
+    entrada = _cache.get(caminho)
+    if entrada is not None and agora - entrada[0] < _TTL_SEGUNDOS:
+        return entrada[1]
+
+    try:
+        resultado: Optional[os.stat_result] = os.stat(caminho)
+    except OSError:
+        resultado = None
+
+    if len(_cache) >= _MAX_ENTRADAS:
+        _cache.clear()
+    _cache[caminho] = (agora, resultado)
+    return resultado
+
+
+def exists(caminho: str) -> bool:
+    """Versão cacheada de os.path.exists."""
+    return stat(caminho) is not None
+
+
+def invalidate(caminho: str) -> None:
+    """Remove um caminho do cache (chamar após criar/alterar o arquivo)."""
+    _cache.pop(os.path.abspath(caminho), None)
+
+
+def clear() -> None:
+    """Esvazia o cache por completo."""
+    _cache.clear()
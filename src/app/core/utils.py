@@ -0,0 +1,83 @@
+import functools
+import re
+from typing import Optional
+
+# Padrões compilados uma única vez no carregamento do módulo: evita a
+# consulta ao cache interno do `re` a cada chamada nos fluxos em lote,
+# onde estas funções rodam para cada arquivo.
+_INVALID_FILENAME_RE = re.compile(r'[<>:"/\\|?*]')
+_WHITESPACE_RE = re.compile(r"\s+")
+# Caracteres fora da lista branca (mantendo espaços, que são colapsados em
+# um segundo passe); a classe negada casa sequências inteiras de uma vez.
+_INVALID_TEXT_RE = re.compile(r"[^\w\s\-.,!?;:()\[\]{}\"'/\\]+")
+_DRIVE_URL_RE = re.compile(r"folders/([a-zA-Z0-9-_]+)")
+# Alfabeto de um ID puro do Drive, para o caminho rápido sem regex
+_DRIVE_ID_CHARS = frozenset(
+    "abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789-_"
+)
+
+
+class FileUtils:
+    """Utilitários para manipulação de nomes de arquivo."""
+
+    @staticmethod
+    def safe_filename(nome: str) -> str:
+        """
+        Remove caracteres inválidos para nomes de arquivo e troca espaços por '_'.
+
+        Args:
+            nome (str): Nome original (ex: nome do aluno vindo da IA).
+
+        Returns:
+            str: Nome seguro para uso em qualquer sistema de arquivos.
+        """
+        nome = _INVALID_FILENAME_RE.sub("", nome)
+        nome = _WHITESPACE_RE.sub("_", nome.strip())
+        return nome or "Aluno"
+
+
+class TextUtils:
+    """Utilitários para limpeza de textos retornados pela IA."""
+
+    @staticmethod
+    def clean_text(texto: str) -> str:
+        """
+        Remove caracteres indesejados e colapsa espaços repetidos.
+
+        Os caracteres inválidos são removidos (não viram espaço): limpar
+        "ab@cd" resulta em "abcd", não em "ab cd".
+
+        Args:
+            texto (str): Texto bruto retornado pela IA.
+
+        Returns:
+            str: Texto limpo, com espaçamento normalizado.
+        """
+        texto = _INVALID_TEXT_RE.sub("", texto)
+        return _WHITESPACE_RE.sub(" ", texto).strip()
+
+
+@functools.lru_cache(maxsize=64)
+def extract_drive_id(url_ou_id: Optional[str]) -> Optional[str]:
+    """
+    Extrai o ID de uma pasta do Google Drive a partir da URL ou do próprio ID.
+
+    O resultado (inclusive o negativo) é memoizado: o Streamlit reexecuta o
+    script a cada interação e revalida a mesma URL digitada muitas vezes.
+
+    Args:
+        url_ou_id (Optional[str]): URL completa da pasta ou o ID direto.
+
+    Returns:
+        Optional[str]: O ID extraído, ou None se a entrada for vazia/inválida.
+    """
+    if not url_ou_id:
+        return None
+    # Caminho rápido: um ID puro só contém [A-Za-z0-9_-]; a checagem de
+    # conjunto evita acionar o motor de regex no caso comum
+    if _DRIVE_ID_CHARS.issuperset(url_ou_id):
+        return url_ou_id
+    match = _DRIVE_URL_RE.search(url_ou_id)
+    if match:
+        return match.group(1)
+    return None
@@ -0,0 +1,139 @@
+import os
+import re
+
+from app.core import path_cache
+from app.core.utils import extract_drive_id
+
+
+class ValidationError(ValueError):
+    """Erro de validação de entrada do usuário."""
+
+
+# Padrões compilados uma única vez no carregamento do módulo: os validadores
+# rodam por redação/arquivo nos fluxos em lote e não devem pagar a consulta
+# ao cache interno do `re` a cada chamada.
+_NAME_RE = re.compile(r"^[a-zA-ZÀ-ÿ\s]+$")
+
+# Extensões de imagem aceitas e limite de tamanho padrão (inline no Gemini)
+_IMAGE_EXTENSIONS = frozenset({".jpg", ".jpeg", ".png"})
+_MAX_IMAGE_SIZE_MB = 20
+
+
+class FileValidator:
+    """Validações de arquivos de imagem no disco."""
+
+    @staticmethod
+    def validate_image_file(
+        caminho: str, max_size_mb: int = _MAX_IMAGE_SIZE_MB
+    ) -> os.stat_result:
+        """
+        Valida existência, extensão e tamanho de uma imagem com uma única
+        chamada a os.stat (em vez de exists + getsize separados).
+
+        Args:
+            caminho (str): Caminho do arquivo de imagem.
+            max_size_mb (int): Tamanho máximo aceito, em megabytes.
+
+        Returns:
+            os.stat_result: Metadados do arquivo, para reuso pelo chamador.
+
+        Raises:
+            ValidationError: Se o arquivo não existir, tiver extensão não
+            suportada ou exceder o tamanho máximo.
+        """
+        info = path_cache.stat(caminho)
+        if info is None:
+            raise ValidationError(f"Arquivo não encontrado: {caminho}")
+
+        extensao = os.path.splitext(caminho)[1].lower()
+        if extensao not in _IMAGE_EXTENSIONS:
+            raise ValidationError(
+                f"Extensão '{extensao}' não suportada (use JPG ou PNG)."
+            )
+
+        if info.st_size > max_size_mb * 1024 * 1024:
+            tamanho_mb = info.st_size / (1024 * 1024)
+            raise ValidationError(
+                f"Arquivo com {tamanho_mb:.1f} MB excede o limite de {max_size_mb} MB."
+            )
+
+        return info
+
+
+class TextValidator:
+    """Validações de campos textuais (nome do aluno, tema da redação)."""
+
+    @staticmethod
+    def validate_student_name(nome: str) -> str:
+        """
+        Valida e normaliza o nome de um aluno.
+
+        Args:
+            nome (str): Nome informado/extraído.
+
+        Returns:
+            str: O nome normalizado (sem espaços nas bordas).
+
+        Raises:
+            ValidationError: Se o nome for vazio ou contiver caracteres inválidos.
+        """
+        # strip() uma única vez; o resultado é reaproveitado em todas as
+        # checagens e no retorno
+        nome = nome.strip() if nome else ""
+        if not nome:
+            raise ValidationError("O nome do aluno não pode ser vazio.")
+        if not _NAME_RE.match(nome):
+            raise ValidationError(
+                "O nome do aluno deve conter apenas letras e espaços."
+            )
+        return nome
+
+    @staticmethod
+    def validate_theme(tema: str) -> str:
+        """
+        Valida e normaliza o tema de uma redação.
+
+        Args:
+            tema (str): Tema informado.
+
+        Returns:
+            str: O tema normalizado (sem espaços nas bordas).
+
+        Raises:
+            ValidationError: Se o tema for vazio, curto demais ou longo demais.
+        """
+        tema = tema.strip() if tema else ""
+        if not tema:
+            raise ValidationError("O tema da redação não pode ser vazio.")
+        tamanho = len(tema)
+        if tamanho < 5:
+            raise ValidationError("O tema deve ter pelo menos 5 caracteres.")
+        if tamanho > 200:
+            raise ValidationError("O tema deve ter no máximo 200 caracteres.")
+        return tema
+
+
+class DriveValidator:
+    """Validações de URLs/IDs de pastas do Google Drive."""
+
+    @staticmethod
+    def validate_folder_id(url_ou_id: str) -> str:
+        """
+        Extrai e valida o ID de uma pasta do Google Drive.
+
+        Args:
+            url_ou_id (str): URL completa da pasta ou o ID direto.
+
+        Returns:
+            str: O ID validado da pasta.
+
+        Raises:
+            ValidationError: Se a entrada não contiver um ID válido.
+        """
+        folder_id = extract_drive_id(url_ou_id)
+        if not folder_id:
+            raise ValidationError(
+                "Link ou ID de pasta do Google Drive inválido. "
+                "Use o link completo da pasta ou apenas o ID."
+            )
+        return folder_id
@@ -1,14 +1,17 @@
+import io
+import mimetypes
 import os
-import re
-import tkinter as tk
-from tkinter import filedialog
+import time
+from concurrent.futures import ThreadPoolExecutor
 
 import streamlit as st
 
 from app.core.logger import get_logger
+from app.core.utils import FileUtils
+from app.core.validators import DriveValidator, FileValidator, ValidationError
 from app.services import ai_service, report_service
-from app.services.drive_service import GoogleDriveService
-from config import Config
+from app.services.drive_service import get_drive_service
+from config import ensure_dirs
 
 # --- Configuração de Logs ---
 logger = get_logger(__name__)
@@ -17,31 +20,55 @@ logger = get_logger(__name__)
 st.set_page_config(layout="wide", page_title="Corretor de Redação Enem", page_icon="📝")
 
 
-# --- Funções Utilitárias ---
-def extrair_id_drive(url_ou_id):
-    """Extrai o ID de uma pasta do Google Drive a partir da URL ou retorna o próprio ID."""
-    if not url_ou_id:
-        return None
-    # Regex para capturar o ID na URL do Drive
-    match = re.search(r"folders/([a-zA-Z0-9-_]+)", url_ou_id)
-    if match:
-        return match.group(1)
-    return url_ou_id
-
-
 # --- Inicialização do Sistema ---
-try:
+@st.cache_resource(show_spinner=False)
+def inicializar_ia() -> bool:
+    """Configura a API do Gemini uma vez por processo, não por rerun."""
     ai_service.configurar_ia()
+    return True
+
+
+@st.cache_resource(show_spinner=False)
+def obter_prompt_mestre() -> str:
+    """Prompt mestre carregado uma vez por processo e compartilhado entre sessões."""
+    return ai_service.carregar_prompt()
+
 
-    # Carrega o prompt apenas uma vez na sessão para otimizar
-    if "prompt_mestre" not in st.session_state:
-        st.session_state["prompt_mestre"] = ai_service.carregar_prompt()
-    PROMPT_MESTRE = st.session_state["prompt_mestre"]
+try:
+    ensure_dirs()
+    inicializar_ia()
+    PROMPT_MESTRE = obter_prompt_mestre()
 
 except Exception as e:
     st.error(f"Erro Crítico na Inicialização: {e}")
     st.stop()
 
+@st.cache_data(max_entries=32, show_spinner=False)
+def gerar_docx_cacheado(dados: dict):
+    """
+    Gera o relatório DOCX com cache por conteúdo: o Streamlit reexecuta o
+    script inteiro a cada interação (ex: clique no botão de download), e
+    sem o cache o mesmo documento seria remontado do zero.
+
+    Falhas viram exceção em vez de retorno None: o st.cache_data não
+    cacheia exceções, então um erro transitório na geração não fica
+    grudado no cache impedindo a regeneração do relatório.
+    """
+    docx_bytes = report_service.preencher_e_gerar_docx(dados)
+    if docx_bytes is None:
+        raise RuntimeError("Geração do DOCX falhou (detalhes nos logs).")
+    return docx_bytes
+
+
+@st.cache_data(ttl=60, show_spinner=False)
+def listar_imagens_pendentes(folder_id: str) -> list:
+    """
+    Listagem do Drive com cache de 60s: reruns seguidos do script (cliques,
+    digitação) reutilizam o resultado em vez de repetir a chamada à API.
+    """
+    return get_drive_service().list_pending_images(folder_id)
+
+
 # --- Cabeçalho Principal ---
 st.title("📝 Corretor de Redação Enem")
 
@@ -78,27 +105,13 @@ with tab1:
 
     if imagem_redacao is not None:
         if st.button("Analisar Redação", type="primary", use_container_width=True):
-            temp_dir = Config.TMP_DIR
-            caminho_img_temp = os.path.join(temp_dir, imagem_redacao.name)
-
-            try:
-                with open(caminho_img_temp, "wb") as f:
-                    f.write(imagem_redacao.getbuffer())
-            except Exception as e:
-                st.error(f"Erro ao salvar arquivo temporário: {e}")
-                st.stop()
-
             with st.spinner("Lendo manuscrito e avaliando competências..."):
+                # O upload já está em memória: os bytes vão direto para a
+                # IA, sem arquivo temporário intermediário
                 dados_redacao = ai_service.analisar_redacao(
-                    caminho_img_temp, PROMPT_MESTRE
+                    imagem_redacao.getvalue(), imagem_redacao.type, PROMPT_MESTRE
                 )
 
-                try:
-                    if os.path.exists(caminho_img_temp):
-                        os.remove(caminho_img_temp)
-                except:
-                    pass
-
                 if dados_redacao:
                     dados_redacao["ano_turma"] = entrada_ano
                     dados_redacao["bimestre"] = entrada_bimestre
@@ -111,13 +124,15 @@ with tab1:
                     with col2:
                         st.metric("Nota Final", dados_redacao.get("nota_final", 0))
 
-                    arquivo_docx_bytes = report_service.preencher_e_gerar_docx(
-                        dados_redacao
-                    )
+                    try:
+                        arquivo_docx_bytes = gerar_docx_cacheado(dados_redacao)
+                    except RuntimeError:
+                        # Falha já logada pelo serviço; sem bytes não há botão
+                        arquivo_docx_bytes = None
 
                     if arquivo_docx_bytes:
-                        nome_limpo = dados_redacao.get("nome_aluno", "Aluno").replace(
-                            " ", "_"
+                        nome_limpo = FileUtils.safe_filename(
+                            dados_redacao.get("nome_aluno", "Aluno")
                         )
                         st.download_button(
                             label="📥 Baixar Relatório Word (.docx)",
@@ -140,6 +155,11 @@ with tab2:
 
     with col_input:
         if st.button("📂 Selecionar Pasta de Entrada"):
+            # Import adiado: o tkinter só é necessário neste clique e não
+            # precisa pesar em cada rerun do script
+            import tkinter as tk
+            from tkinter import filedialog
+
             root = tk.Tk()
             root.withdraw()
             root.attributes("-topmost", True)
@@ -156,6 +176,9 @@ with tab2:
 
     with col_output:
         if st.button("📂 Selecionar Pasta de Saída"):
+            import tkinter as tk
+            from tkinter import filedialog
+
             root = tk.Tk()
             root.withdraw()
             root.attributes("-topmost", True)
@@ -198,17 +221,34 @@ with tab2:
 
                 sucessos = 0
                 erros = 0
+                ultimo_update = 0.0
 
                 for i, nome_arquivo in enumerate(arquivos):
                     caminho_completo = os.path.join(pasta_entrada, nome_arquivo)
-                    status_text.text(
-                        f"Processando ({i + 1}/{len(arquivos)}): {nome_arquivo}"
+
+                    # Atualizações de UI limitadas a ~10/s: cada .text e
+                    # .progress gera um frame de WebSocket para o navegador.
+                    # O último item sempre atualiza, para fechar em 100%.
+                    agora = time.monotonic()
+                    atualizar_ui = (
+                        agora - ultimo_update > 0.1 or i + 1 == len(arquivos)
                     )
+                    if atualizar_ui:
+                        ultimo_update = agora
+                        status_text.text(
+                            f"Processando ({i + 1}/{len(arquivos)}): {nome_arquivo}"
+                        )
 
                     try:
-                        # 1. IA analisa
+                        # 0. Valida o arquivo (uma única chamada a os.stat)
+                        FileValidator.validate_image_file(caminho_completo)
+
+                        # 1. IA analisa (bytes lidos uma única vez)
+                        with open(caminho_completo, "rb") as f:
+                            imagem_bytes = f.read()
+                        mime_type = mimetypes.guess_type(nome_arquivo)[0]
                         dados_redacao = ai_service.analisar_redacao(
-                            caminho_completo, PROMPT_MESTRE
+                            imagem_bytes, mime_type, PROMPT_MESTRE
                         )
 
                         if dados_redacao:
@@ -223,15 +263,15 @@ with tab2:
 
                             if doc_buffer:
                                 # 4. Salva no disco local
-                                nome_aluno = dados_redacao.get(
-                                    "nome_aluno", f"Aluno_{i}"
-                                ).replace(" ", "_")
+                                nome_aluno = FileUtils.safe_filename(
+                                    dados_redacao.get("nome_aluno", f"Aluno_{i}")
+                                )
                                 caminho_doc_saida = os.path.join(
                                     pasta_saida, f"Correcao_{nome_aluno}.docx"
                                 )
 
                                 with open(caminho_doc_saida, "wb") as f:
-                                    f.write(doc_buffer.getbuffer())
+                                    f.write(doc_buffer)
 
                                 sucessos += 1
                                 log_container.success(
@@ -246,14 +286,19 @@ with tab2:
                             erros += 1
                             log_container.error(f"❌ Falha na IA para: {nome_arquivo}")
 
+                    except ValidationError as e:
+                        erros += 1
+                        log_container.error(f"❌ Arquivo inválido {nome_arquivo}: {e}")
+
                     except Exception as e:
                         erros += 1
                         log_container.error(
                             f"💥 Erro inesperado em {nome_arquivo}: {e}"
                         )
 
-                    # Atualiza progresso
-                    progress_bar.progress((i + 1) / len(arquivos))
+                    # Atualiza progresso (limitado junto com o status)
+                    if atualizar_ui:
+                        progress_bar.progress((i + 1) / len(arquivos))
 
                 st.divider()
                 st.success(
@@ -283,94 +328,172 @@ with tab3:
     if st.button(
         "Iniciar Processamento Cloud", type="primary", use_container_width=True
     ):
-        id_entrada = extrair_id_drive(url_entrada_drive)
-        id_saida = extrair_id_drive(url_saida_drive)
-
-        if not id_entrada or not id_saida:
-            st.warning("Por favor, forneça links válidos para as pastas do Drive.")
-        else:
+        try:
+            id_entrada = DriveValidator.validate_folder_id(url_entrada_drive)
+            id_saida = DriveValidator.validate_folder_id(url_saida_drive)
+        except ValidationError as erro_validacao:
+            id_entrada = id_saida = None
+            st.warning(str(erro_validacao))
+
+        if id_entrada and id_saida:
             try:
                 with st.spinner("Conectando ao Google Drive..."):
-                    drive_service = GoogleDriveService()
-                    itens = drive_service.list_pending_images(id_entrada)
+                    drive_service = get_drive_service()
+                    itens = listar_imagens_pendentes(id_entrada)
 
                 if not itens:
                     st.warning("Nenhuma imagem encontrada na pasta do Drive informada.")
                 else:
+                    # Pipeline em grupos limitados: enquanto o grupo N é
+                    # analisado/enviado, uma thread baixa o grupo N+1. No
+                    # máximo dois grupos de imagens ficam em memória por
+                    # vez, em vez da pasta inteira (que pode ter centenas
+                    # de fotos), e os bytes de cada grupo são descartados
+                    # assim que seus relatórios sobem
+                    tamanho_grupo = 8
+                    grupos = [
+                        itens[inicio : inicio + tamanho_grupo]
+                        for inicio in range(0, len(itens), tamanho_grupo)
+                    ]
+
                     progress_bar = st.progress(0)
                     status_text = st.empty()
                     log_container = st.container()
 
                     sucessos_drive = 0
                     erros_drive = 0
+                    ultimo_update = 0.0
+                    i = 0  # posição global, para o progresso
 
-                    for i, item in enumerate(itens):
-                        file_id = item["id"]
-                        file_name = item["name"]
-                        status_text.text(
-                            f"Processando ({i + 1}/{len(itens)}): {file_name}"
+                    with ThreadPoolExecutor(max_workers=1) as prefetcher:
+                        proximo = prefetcher.submit(
+                            drive_service.download_files,
+                            [item["id"] for item in grupos[0]],
                         )
 
-                        caminho_temp = os.path.join(Config.TMP_DIR, file_name)
-
-                        try:
-                            # 1. Download
-                            conteudo = drive_service.download_file(file_id)
-                            with open(caminho_temp, "wb") as f:
-                                f.write(conteudo)
+                        for g, grupo in enumerate(grupos):
+                            conteudos = proximo.result()
+                            if g + 1 < len(grupos):
+                                proximo = prefetcher.submit(
+                                    drive_service.download_files,
+                                    [item["id"] for item in grupos[g + 1]],
+                                )
 
-                            # 2. IA
-                            dados = ai_service.analisar_redacao(
-                                caminho_temp, PROMPT_MESTRE
+                            # Análise agrupada: várias redações por chamada
+                            # ao Gemini, em vez de um round-trip por imagem
+                            validos = [
+                                item for item in grupo if conteudos.get(item["id"])
+                            ]
+                            status_text.text(
+                                f"Analisando {len(validos)} redações com a IA..."
+                            )
+                            analises = ai_service.analisar_redacoes_lote(
+                                [
+                                    (
+                                        conteudos[item["id"]],
+                                        mimetypes.guess_type(item["name"])[0],
+                                    )
+                                    for item in validos
+                                ],
+                                PROMPT_MESTRE,
                             )
+                            dados_por_id = {
+                                item["id"]: dados
+                                for item, dados in zip(validos, analises)
+                            }
+
+                            for item in grupo:
+                                i += 1
+                                file_id = item["id"]
+                                file_name = item["name"]
+
+                                # Mesmo limite de ~10 atualizações/s da aba
+                                # local
+                                agora = time.monotonic()
+                                atualizar_ui = (
+                                    agora - ultimo_update > 0.1
+                                    or i == len(itens)
+                                )
+                                if atualizar_ui:
+                                    ultimo_update = agora
+                                    status_text.text(
+                                        f"Processando ({i}/{len(itens)}): {file_name}"
+                                    )
 
-                            if dados:
-                                dados["ano_turma"] = entrada_ano
-                                dados["bimestre"] = entrada_bimestre
+                                try:
+                                    # 1. Conteúdo pré-baixado (memória)
+                                    conteudo = conteudos.get(file_id)
 
-                                # 3. DOCX
-                                doc_buffer = report_service.preencher_e_gerar_docx(
-                                    dados
-                                )
+                                    if not conteudo:
+                                        erros_drive += 1
+                                        log_container.error(
+                                            f"❌ Falha no download: {file_name}"
+                                        )
+                                        continue
 
-                                if doc_buffer:
-                                    # 4. Upload
-                                    nome_aluno = dados.get(
-                                        "nome_aluno", f"Aluno_{i}"
-                                    ).replace(" ", "_")
-                                    nome_final = f"Correcao_{nome_aluno}.docx"
+                                    # 2. Análise da etapa agrupada
+                                    dados = dados_por_id.get(file_id)
 
-                                    novo_id = drive_service.upload_docx(
-                                        doc_buffer, nome_final, id_saida
-                                    )
+                                    if dados:
+                                        dados["ano_turma"] = entrada_ano
+                                        dados["bimestre"] = entrada_bimestre
 
-                                    if novo_id:
-                                        sucessos_drive += 1
-                                        log_container.success(
-                                            f"✅ Sucesso: {file_name} enviado para o Drive."
+                                        # 3. DOCX
+                                        doc_buffer = (
+                                            report_service.preencher_e_gerar_docx(
+                                                dados
+                                            )
                                         )
+
+                                        if doc_buffer:
+                                            # 4. Upload
+                                            nome_aluno = FileUtils.safe_filename(
+                                                dados.get(
+                                                    "nome_aluno", f"Aluno_{i}"
+                                                )
+                                            )
+                                            nome_final = (
+                                                f"Correcao_{nome_aluno}.docx"
+                                            )
+
+                                            novo_id = drive_service.upload_docx(
+                                                io.BytesIO(doc_buffer),
+                                                nome_final,
+                                                id_saida,
+                                            )
+
+                                            if novo_id:
+                                                sucessos_drive += 1
+                                                log_container.success(
+                                                    f"✅ Sucesso: {file_name} enviado para o Drive."
+                                                )
+                                            else:
+                                                erros_drive += 1
+                                                log_container.error(
+                                                    f"❌ Falha no upload: {file_name}"
+                                                )
+                                        else:
+                                            erros_drive += 1
+                                            log_container.error(
+                                                f"❌ Erro ao gerar DOCX: {file_name}"
+                                            )
                                     else:
                                         erros_drive += 1
                                         log_container.error(
-                                            f"❌ Falha no upload: {file_name}"
+                                            f"❌ Falha na IA: {file_name}"
                                         )
-                                else:
+
+                                except Exception as e:
                                     erros_drive += 1
                                     log_container.error(
-                                        f"❌ Erro ao gerar DOCX: {file_name}"
+                                        f"💥 Erro em {file_name}: {e}"
                                     )
-                            else:
-                                erros_drive += 1
-                                log_container.error(f"❌ Falha na IA: {file_name}")
-
-                        except Exception as e:
-                            erros_drive += 1
-                            log_container.error(f"💥 Erro em {file_name}: {e}")
-                        finally:
-                            if os.path.exists(caminho_temp):
-                                os.remove(caminho_temp)
+                                finally:
+                                    if atualizar_ui:
+                                        progress_bar.progress(i / len(itens))
 
-                        progress_bar.progress((i + 1) / len(itens))
+                            # Libera os bytes do grupo antes do próximo
+                            conteudos.clear()
 
                     st.success(
                         f"Concluído! Sucessos: {sucessos_drive}, Erros: {erros_drive}"
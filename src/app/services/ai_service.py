@@ -1,15 +1,36 @@
 import json
 import os
-from typing import Any, Dict, Optional, TypedDict
-
-import google.generativeai as genai
-from PIL import Image
+import threading
+import traceback
+from typing import Any, Dict, List, Optional, Tuple, TypedDict
 
 from app.core.logger import get_logger
 from config import Config
 
 logger = get_logger(__name__)
 
+# Parser JSON acelerado quando disponível: orjson é implementado em C e
+# suas exceções derivam de json.JSONDecodeError, então o tratamento de
+# erros existente continua valendo
+try:
+    import orjson as _json
+except ImportError:
+    _json = json
+
+# Módulo genai importado sob demanda: o import arrasta grpc/protobuf/absl
+# (centenas de ms) e o Streamlit reexecuta o script a cada interação
+_genai = None
+
+
+def _importar_genai():
+    """Importa (uma única vez) o google.generativeai, que tem import pesado."""
+    global _genai
+    if _genai is None:
+        import google.generativeai as genai
+
+        _genai = genai
+    return _genai
+
 
 class DetalheCompetencia(TypedDict):
     nota: int
@@ -47,14 +68,15 @@ def configurar_ia() -> None:
             )
             cred_file = Config.GOOGLE_CREDENTIALS_PATH
             if os.path.exists(cred_file):
-                os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = cred_file
+                # os.environ só aceita str; Config entrega caminhos como Path
+                os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = str(cred_file)
             else:
                 raise ValueError(
                     "Nenhuma chave de API ou arquivo de credenciais encontrado."
                 )
 
         if api_key:
-            genai.configure(api_key=api_key)
+            _importar_genai().configure(api_key=api_key)
 
         logger.info("IA Configurada com sucesso (Método API Key).")
 
@@ -63,10 +85,51 @@ def configurar_ia() -> None:
         raise
 
 
+# Modelo construído uma única vez por processo e reutilizado entre chamadas;
+# o Lock evita construção dupla quando o lote roda em múltiplas threads
+_modelo = None
+_modelo_lock = threading.Lock()
+
+
+def _obter_modelo():
+    """Retorna o modelo Gemini compartilhado, construindo-o na primeira chamada."""
+    global _modelo
+    if _modelo is None:
+        with _modelo_lock:
+            if _modelo is None:
+                genai = _importar_genai()
+                generation_config = genai.GenerationConfig(
+                    response_mime_type="application/json",
+                    temperature=0.1,  # ← Mudou de 0.3 para 0.1 (mais determinístico)
+                    max_output_tokens=8000,
+                )
+                _modelo = genai.GenerativeModel(
+                    model_name=Config.MODEL_NAME,
+                    generation_config=generation_config,
+                )
+    return _modelo
+
+
+# Cache do prompt por caminho: (mtime_ns, tamanho, conteúdo). Revalidado
+# pelos metadados do arquivo, então edições no prompt são percebidas.
+_prompt_cache: Dict[str, Tuple[int, int, str]] = {}
+
+
 def carregar_prompt(caminho_prompt: str = Config.PROMPT_PATH) -> str:
-    """Carrega o prompt do arquivo."""
+    """Carrega o prompt do arquivo, com cache revalidado por mtime/tamanho."""
+    info = os.stat(caminho_prompt)
+    cacheado = _prompt_cache.get(caminho_prompt)
+    if (
+        cacheado is not None
+        and cacheado[0] == info.st_mtime_ns
+        and cacheado[1] == info.st_size
+    ):
+        return cacheado[2]
+
     with open(caminho_prompt, "r", encoding="utf-8") as f:
-        return f.read()
+        conteudo = f.read()
+    _prompt_cache[caminho_prompt] = (info.st_mtime_ns, info.st_size, conteudo)
+    return conteudo
 
 
 def limpar_resposta_json(texto: str) -> str:
@@ -80,6 +143,14 @@ def limpar_resposta_json(texto: str) -> str:
     return texto
 
 
+# Chaves e texto padrão das cinco competências, definidos uma única vez
+_COMP_KEYS = ("c1", "c2", "c3", "c4", "c5")
+_ANALISE_PADRAO = "Análise não disponível."
+
+# Cada competência do Enem vale de 0 a 200 pontos
+_NOTA_MAXIMA = 200
+
+
 def validar_e_corrigir_dados(dados: Dict[str, Any]) -> Dict[str, Any]:
     """
     Valida e corrige dados retornados pela IA.
@@ -90,53 +161,48 @@ def validar_e_corrigir_dados(dados: Dict[str, Any]) -> Dict[str, Any]:
     dados.setdefault("data_redacao", "Não identificado")
     dados.setdefault("comentarios_gerais", "")
     dados.setdefault("alerta_originalidade", None)
-    dados.setdefault("analise_competencias", {})
-
-    # Calcula nota_final se não existir ou estiver zerada
-    comps = dados.get("analise_competencias", {})
-    total = 0
 
-    for i in range(1, 6):
-        comp_key = f"c{i}"
-        if comp_key not in comps:
-            comps[comp_key] = {"nota": 0, "analise": "Análise não disponível."}
-
-        # Garante que a competência tem nota e análise
-        comp = comps[comp_key]
-        comp.setdefault("nota", 0)
-        comp.setdefault("analise", "Análise não disponível.")
-
-        total += int(comp.get("nota", 0))
+    # Reconstrói as competências de uma só vez, grampeando as notas na
+    # faixa válida (0 a 200), sem mutação incremental
+    comps_in = dados.get("analise_competencias") or {}
+    comps = {
+        chave: {
+            "nota": min(
+                _NOTA_MAXIMA,
+                max(0, int((comps_in.get(chave) or {}).get("nota") or 0)),
+            ),
+            "analise": (comps_in.get(chave) or {}).get("analise") or _ANALISE_PADRAO,
+        }
+        for chave in _COMP_KEYS
+    }
+    dados["analise_competencias"] = comps
 
     # Atualiza ou define nota_final
     if dados.get("nota_final", 0) == 0:
-        dados["nota_final"] = total
+        dados["nota_final"] = sum(comp["nota"] for comp in comps.values())
 
     return dados
 
 
-def analisar_redacao(caminho_imagem: str, prompt: str) -> Optional[Dict[str, Any]]:
+def analisar_redacao(
+    imagem_bytes: bytes, mime_type: str, prompt: str
+) -> Optional[Dict[str, Any]]:
     """
-    Analisa uma redação usando o Gemini Vision.
+    Analisa uma redação (bytes da imagem) usando o Gemini Vision.
     Retorna um dicionário com os dados da correção.
+
+    Receber os bytes diretamente evita o vai-e-vem pelo disco: uploads do
+    Streamlit e downloads do Drive já chegam em memória.
     """
     try:
-        generation_config = genai.GenerationConfig(
-            response_mime_type="application/json",
-            temperature=0.1,  # ← Mudou de 0.3 para 0.1 (mais determinístico)
-            max_output_tokens=8000,
-        )
+        model = _obter_modelo()
 
-        model = genai.GenerativeModel(
-            model_name=Config.MODEL_NAME, generation_config=generation_config
-        )
-
-        if not os.path.exists(caminho_imagem):
-            logger.error(f"Imagem não encontrada: {caminho_imagem}")
-            return None
-
-        logger.info(f"Carregando imagem: {caminho_imagem}")
-        img = Image.open(caminho_imagem)
+        # Bytes brutos: a API aceita o arquivo comprimido diretamente,
+        # sem necessidade de decodificar via PIL
+        img = {
+            "mime_type": mime_type or "image/jpeg",
+            "data": imagem_bytes,
+        }
 
         logger.info("Enviando para a IA...")
         response = model.generate_content([prompt, img])
@@ -155,7 +221,7 @@ def analisar_redacao(caminho_imagem: str, prompt: str) -> Optional[Dict[str, Any
 
         # Limpa e parseia o JSON
         texto_limpo = limpar_resposta_json(response.text)
-        dados = json.loads(texto_limpo)
+        dados = _json.loads(texto_limpo)
 
         # Valida e corrige os dados
         dados = validar_e_corrigir_dados(dados)
@@ -167,9 +233,9 @@ def analisar_redacao(caminho_imagem: str, prompt: str) -> Optional[Dict[str, Any
         logger.info(f"  - Data: {dados.get('data_redacao')}")
         logger.info(f"  - Nota Final: {dados.get('nota_final')}")
 
-        for i in range(1, 6):
-            nota = dados["analise_competencias"].get(f"c{i}", {}).get("nota", 0)
-            logger.info(f"  - C{i}: {nota} pontos")
+        for chave in _COMP_KEYS:
+            nota = dados["analise_competencias"][chave]["nota"]
+            logger.info(f"  - {chave.upper()}: {nota} pontos")
 
         return dados
 
@@ -185,8 +251,82 @@ def analisar_redacao(caminho_imagem: str, prompt: str) -> Optional[Dict[str, Any
         return None
 
     except Exception as e:
-        logger.error(f"Erro na chamada da IA: {e}")
-        import traceback
+        # Erros de cota têm tipo próprio na api_core: dispatch por tipo em
+        # vez de procurar "quota" no texto da exceção
+        from google.api_core import exceptions as gexc
+
+        if isinstance(e, (gexc.ResourceExhausted, gexc.TooManyRequests)):
+            logger.error(
+                "Cota ou limite de requisições da API Gemini atingido; "
+                "aguarde alguns instantes antes de tentar novamente."
+            )
+            return None
 
+        logger.error(f"Erro na chamada da IA: {e}")
         logger.error(traceback.format_exc())
         return None
+
+
+# Redações por chamada em lote: grupos maiores renderiam respostas além do
+# orçamento de max_output_tokens do modelo
+_MAX_REDACOES_POR_CHAMADA = 4
+
+
+def analisar_redacoes_lote(
+    imagens: List[Tuple[bytes, str]], prompt: str
+) -> List[Optional[Dict[str, Any]]]:
+    """
+    Analisa várias redações coalescendo-as em chamadas agrupadas ao Gemini.
+
+    A latência por chamada (rede + fila do modelo) domina o tempo de um
+    lote; enviar K imagens por requisição divide o número de round-trips
+    por K. Grupos cuja resposta agrupada falhar são reprocessados um a um,
+    então o resultado nunca é pior do que o fluxo redação a redação.
+    """
+    resultados: List[Optional[Dict[str, Any]]] = []
+    for inicio in range(0, len(imagens), _MAX_REDACOES_POR_CHAMADA):
+        grupo = imagens[inicio : inicio + _MAX_REDACOES_POR_CHAMADA]
+        resultados.extend(_analisar_grupo(grupo, prompt))
+    return resultados
+
+
+def _analisar_grupo(
+    grupo: List[Tuple[bytes, str]], prompt: str
+) -> List[Optional[Dict[str, Any]]]:
+    """Analisa um grupo de redações em uma chamada, com fallback individual."""
+    if len(grupo) == 1:
+        imagem_bytes, mime_type = grupo[0]
+        return [analisar_redacao(imagem_bytes, mime_type, prompt)]
+
+    try:
+        model = _obter_modelo()
+        partes = [
+            {"mime_type": mime_type or "image/jpeg", "data": imagem_bytes}
+            for imagem_bytes, mime_type in grupo
+        ]
+
+        prompt_lote = (
+            f"{prompt}\n\n"
+            f"IMPORTANTE: Você receberá {len(grupo)} imagens de redações, em "
+            "ordem. Responda APENAS com uma lista JSON contendo um objeto de "
+            "correção por redação, na mesma ordem das imagens."
+        )
+
+        response = model.generate_content([prompt_lote, *partes])
+        dados = _json.loads(limpar_resposta_json(response.text))
+
+        if isinstance(dados, list) and len(dados) == len(grupo):
+            logger.info(f"Lote de {len(grupo)} redações analisado em uma chamada.")
+            return [validar_e_corrigir_dados(item) for item in dados]
+
+        logger.warning(
+            "Resposta em lote fora do formato esperado; reprocessando "
+            "individualmente."
+        )
+    except Exception as e:
+        logger.warning(f"Falha na análise em lote ({e}); reprocessando uma a uma.")
+
+    return [
+        analisar_redacao(imagem_bytes, mime_type, prompt)
+        for imagem_bytes, mime_type in grupo
+    ]
@@ -1,7 +1,11 @@
 import io
 import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, List, Optional
 
+import google_auth_httplib2
+import httplib2
 from google.auth.transport.requests import Request
 from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import InstalledAppFlow
@@ -15,6 +19,19 @@ logger = get_logger(__name__)
 
 SCOPES = ["https://www.googleapis.com/auth/drive"]
 
+# Downloads simultâneos no lote: o gargalo é latência de rede, então
+# sobrepor requisições aproxima o tempo total do tempo de um único download
+MAX_DOWNLOADS_SIMULTANEOS = 8
+
+# Upload em blocos de 1 MiB: pico de memória limitado e, em caso de falha,
+# só o bloco corrente é reenviado em vez do arquivo inteiro
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+# Filtro fixo de listagem, montado uma única vez no carregamento do módulo
+_IMAGENS_QUERY_SUFFIX = (
+    " and (mimeType='image/jpeg' or mimeType='image/png') and trashed=false"
+)
+
 
 class GoogleDriveService:
     """
@@ -23,8 +40,21 @@ class GoogleDriveService:
     """
 
     def __init__(self):
+        self._local = threading.local()
         self.service = self._authenticate()
 
+    def _http_da_thread(self):
+        """
+        Transporte HTTP autenticado exclusivo da thread corrente: o httplib2
+        compartilhado pelo Resource não é thread-safe, então chamadas de
+        mídia feitas por workers usam o próprio transporte.
+        """
+        if not hasattr(self._local, "http"):
+            self._local.http = google_auth_httplib2.AuthorizedHttp(
+                self._creds, http=httplib2.Http()
+            )
+        return self._local.http
+
     def _authenticate(self) -> Resource:
         """
         Realiza a autenticação OAuth2 e retorna o cliente do Drive.
@@ -33,6 +63,8 @@ class GoogleDriveService:
         token_path = Config.DRIVE_TOKEN_PATH
         credentials_path = Config.DRIVE_CREDENTIALS_PATH
 
+        self._creds = None
+
         # 1. Tenta carregar token existente
         if os.path.exists(token_path):
             try:
@@ -64,25 +96,35 @@ class GoogleDriveService:
                 creds = flow.run_local_server(port=0)
                 logger.info("Autenticação via navegador realizada com sucesso.")
 
-            # 3. Salva o token atualizado
-            with open(token_path, "w") as token:
-                token.write(creds.to_json())
-
-        return build("drive", "v3", credentials=creds)
+            # 3. Salva o token atualizado (só reescreve se de fato mudou)
+            novo_token = creds.to_json()
+            token_atual = None
+            if os.path.exists(token_path):
+                try:
+                    with open(token_path, "r") as token:
+                        token_atual = token.read()
+                except OSError:
+                    pass
+            if novo_token != token_atual:
+                with open(token_path, "w") as token:
+                    token.write(novo_token)
+
+        self._creds = creds
+        # cache_discovery=False evita o cache em disco do documento de
+        # discovery (e o warning do oauth2client ausente)
+        return build("drive", "v3", credentials=creds, cache_discovery=False)
 
     def list_pending_images(self, folder_id: str) -> List[Dict[str, str]]:
         """
         Lista arquivos de imagem (jpg/png) em uma pasta específica.
         Ignora arquivos na lixeira.
         """
-        query = (
-            f"'{folder_id}' in parents and "
-            f"(mimeType='image/jpeg' or mimeType='image/png') and "
-            f"trashed=false"
-        )
+        query = f"'{folder_id}' in parents" + _IMAGENS_QUERY_SUFFIX
         try:
             results = (
-                self.service.files().list(q=query, fields="files(id, name)").execute()
+                self.service.files()
+                .list(q=query, fields="files(id, name)", pageSize=1000)
+                .execute()
             )
             items = results.get("files", [])
             return items
@@ -96,12 +138,28 @@ class GoogleDriveService:
         """
         try:
             request = self.service.files().get_media(fileId=file_id)
-            file_data = request.execute()
+            file_data = request.execute(http=self._http_da_thread())
             return file_data
         except Exception as e:
             logger.error(f"Erro ao baixar arquivo ID {file_id}: {e}")
             return None
 
+    def download_files(self, file_ids: List[str]) -> Dict[str, Optional[bytes]]:
+        """
+        Baixa vários arquivos em paralelo e retorna {file_id: bytes}.
+        Arquivos que falharem ficam com valor None no dicionário.
+        """
+        def _baixar(file_id: str):
+            try:
+                request = self.service.files().get_media(fileId=file_id)
+                return file_id, request.execute(http=self._http_da_thread())
+            except Exception as e:
+                logger.error(f"Erro ao baixar arquivo ID {file_id}: {e}")
+                return file_id, None
+
+        with ThreadPoolExecutor(max_workers=MAX_DOWNLOADS_SIMULTANEOS) as executor:
+            return dict(executor.map(_baixar, file_ids))
+
     def upload_docx(
         self, file_buffer: io.BytesIO, file_name: str, folder_id: str
     ) -> Optional[str]:
@@ -115,17 +173,36 @@ class GoogleDriveService:
             media = MediaIoBaseUpload(
                 file_buffer,
                 mimetype="application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+                chunksize=UPLOAD_CHUNK_SIZE,
+                resumable=True,
             )
 
-            file = (
-                self.service.files()
-                .create(body=file_metadata, media_body=media, fields="id")
-                .execute()
+            request = self.service.files().create(
+                body=file_metadata, media_body=media, fields="id"
             )
 
-            logger.info(f"Upload concluído: {file_name} (ID: {file.get('id')})")
-            return file.get("id")
+            # num_retries aplica backoff exponencial automático em 5xx/429
+            http = self._http_da_thread()
+            response = None
+            while response is None:
+                _, response = request.next_chunk(http=http, num_retries=3)
+
+            logger.info(f"Upload concluído: {file_name} (ID: {response.get('id')})")
+            return response.get("id")
 
         except Exception as e:
             logger.error(f"Erro ao fazer upload do arquivo {file_name}: {e}")
             return None
+
+
+# Instância única por processo: a autenticação (leitura do token + build do
+# cliente) é paga uma vez e reaproveitada pelos fluxos seguintes
+_instance: Optional[GoogleDriveService] = None
+
+
+def get_drive_service() -> GoogleDriveService:
+    """Retorna a instância compartilhada (e já autenticada) do serviço."""
+    global _instance
+    if _instance is None:
+        _instance = GoogleDriveService()
+    return _instance
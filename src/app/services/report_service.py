@@ -1,9 +1,14 @@
+import functools
+import os
+import re
+import traceback
 from io import BytesIO
 from typing import Any, Dict, Optional
 from docx import Document
 from docx.oxml.text.paragraph import CT_P
 from docx.oxml.table import CT_Tbl
 from docx.table import Table, _Cell
+from docx.oxml.ns import qn
 from docx.text.paragraph import Paragraph
 
 from app.core.logger import get_logger
@@ -11,110 +16,173 @@ from config import Config
 
 logger = get_logger(__name__)
 
+# Tag qualificada resolvida uma única vez no carregamento do módulo: o
+# element.iter() do lxml percorre os nós w:t direto em C, sem passar pelo
+# compilador/avaliador de XPath.
+_W_T = qn("w:t")
 
-def substituir_em_paragrafo(paragrafo: Paragraph, substituicoes: Dict[str, str]) -> None:
+# (chave nos dados, placeholder da nota, placeholder da análise) de cada
+# competência, formatados uma única vez no carregamento do módulo
+_CAMPOS_COMPETENCIAS = tuple(
+    (f"c{i}", f"{{{{NOTA_C{i}}}}}", f"{{{{ANALISE_C{i}}}}}") for i in range(1, 6)
+)
+
+
+@functools.lru_cache(maxsize=4)
+def _carregar_template_bytes(caminho_template: str, mtime_ns: int) -> bytes:
+    """
+    Lê os bytes do template uma única vez por versão do arquivo.
+
+    O mtime na chave invalida o cache automaticamente quando o template é
+    editado; relatórios seguintes na mesma sessão pulam o I/O de disco.
+    """
+    with open(caminho_template, "rb") as f:
+        return f.read()
+
+
+def _distribuir(
+    texto: str, inicio: int, fim: int, limites, saidas, idx: int
+) -> int:
+    """
+    Copia texto[inicio:fim] para as saídas dos runs que cobrem o trecho,
+    avançando o cursor de run. Retorna o índice do run corrente.
+    """
+    while inicio < fim:
+        while limites[idx] <= inicio:
+            idx += 1
+        corte = min(fim, limites[idx])
+        saidas[idx].append(texto[inicio:corte])
+        inicio = corte
+    return idx
+
+
+def substituir_em_paragrafo(
+    paragrafo: Paragraph, padrao: re.Pattern, substituicoes: Dict[str, str]
+) -> None:
     """
     Substitui placeholders em um parágrafo, lidando com o problema
     de placeholders quebrados em múltiplos runs.
-    
+
     Estratégia:
-    1. Concatena todo o texto dos runs
-    2. Verifica se há placeholders a substituir
-    3. Se sim, reconstrói o parágrafo com o texto substituído
+    1. Concatena todo o texto dos runs, anotando o limite de cada um
+    2. Percorre os matches em um único passe para a frente: trechos
+       intactos voltam para os runs de origem e cada valor entra no run
+       onde o placeholder começa
+
+    Como os runs são preservados (em vez de reconstruir o parágrafo com um
+    run único), a formatação de cada trecho permanece intacta.
     """
+    runs = paragrafo.runs
+
     # Pega o texto completo do parágrafo
-    texto_completo = ''.join(run.text for run in paragrafo.runs)
-    
-    # Verifica se há algum placeholder neste parágrafo
-    tem_placeholder = any(placeholder in texto_completo for placeholder in substituicoes.keys())
-    
-    if not tem_placeholder:
+    texto_completo = ''.join(run.text for run in runs)
+
+    # Todos os placeholders começam com "{{": um único scan de substring
+    # descarta o parágrafo, em vez de uma varredura por chave
+    if "{{" not in texto_completo:
         return  # Nada a fazer
-    
-    # Aplica todas as substituições
-    texto_novo = texto_completo
-    for placeholder, valor in substituicoes.items():
-        if placeholder in texto_novo:
-            texto_novo = texto_novo.replace(placeholder, str(valor))
-    
-    # Se o texto mudou, reconstrói o parágrafo
-    if texto_novo != texto_completo:
-        # Salva a formatação do primeiro run (se houver)
-        formato_original = None
-        if paragrafo.runs:
-            primeiro_run = paragrafo.runs[0]
-            formato_original = {
-                'bold': primeiro_run.bold,
-                'italic': primeiro_run.italic,
-                'underline': primeiro_run.underline,
-                'font_name': primeiro_run.font.name,
-                'font_size': primeiro_run.font.size,
-            }
-        
-        # Limpa todos os runs
-        for run in paragrafo.runs:
-            run.text = ''
-        
-        # Cria um novo run com o texto substituído
-        novo_run = paragrafo.add_run(texto_novo)
-        
-        # Restaura a formatação original (se possível)
-        if formato_original:
-            try:
-                novo_run.bold = formato_original['bold']
-                novo_run.italic = formato_original['italic']
-                novo_run.underline = formato_original['underline']
-                if formato_original['font_name']:
-                    novo_run.font.name = formato_original['font_name']
-                if formato_original['font_size']:
-                    novo_run.font.size = formato_original['font_size']
-            except Exception as e:
-                logger.warning(f"Não foi possível restaurar formatação: {e}")
-
-
-def processar_tabela(tabela: Table, substituicoes: Dict[str, str]) -> None:
+
+    # Offset final (exclusivo) de cada run, calculado em um único passe
+    limites = []
+    posicao = 0
+    for run in runs:
+        posicao += len(run.text)
+        limites.append(posicao)
+
+    saidas = [[] for _ in runs]
+    idx = 0
+    cursor = 0
+    houve_match = False
+
+    for match in padrao.finditer(texto_completo):
+        houve_match = True
+        inicio, fim = match.span()
+        idx = _distribuir(texto_completo, cursor, inicio, limites, saidas, idx)
+        alvo = idx
+        while limites[alvo] <= inicio:
+            alvo += 1
+        saidas[alvo].append(substituicoes[match.group(0)])
+        cursor = fim
+
+    if not houve_match:
+        return
+
+    _distribuir(texto_completo, cursor, len(texto_completo), limites, saidas, idx)
+
+    for run, pedacos in zip(runs, saidas):
+        texto = "".join(pedacos)
+        if run.text != texto:
+            run.text = texto
+
+
+def processar_tabela(
+    tabela: Table, padrao: re.Pattern, substituicoes: Dict[str, str]
+) -> None:
     """Processa todas as células de uma tabela."""
     for linha in tabela.rows:
         for celula in linha.cells:
             for paragrafo in celula.paragraphs:
-                substituir_em_paragrafo(paragrafo, substituicoes)
+                substituir_em_paragrafo(paragrafo, padrao, substituicoes)
 
 
-def processar_secao(section, substituicoes: Dict[str, str]) -> None:
+def _contem_placeholder(elemento) -> bool:
+    """
+    Varredura barata de um subtrecho XML: True se algum nó w:t contém um
+    candidato a placeholder. Usa '{' (e não '{{') para não errar quando o
+    delimitador está dividido entre dois runs.
+    """
+    for no in elemento.iter(_W_T):
+        texto = no.text
+        if texto and "{" in texto:
+            return True
+    return False
+
+
+def processar_secao(
+    section, padrao: re.Pattern, substituicoes: Dict[str, str]
+) -> None:
     """Processa cabeçalhos e rodapés de uma seção."""
+    # Cabeçalhos/rodapés de boilerplate (sem nenhum placeholder) não pagam
+    # a travessia de parágrafos e tabelas do python-docx
     # Processa cabeçalho
-    if section.header:
+    if section.header and _contem_placeholder(section.header._element):
         for paragrafo in section.header.paragraphs:
-            substituir_em_paragrafo(paragrafo, substituicoes)
-        
+            substituir_em_paragrafo(paragrafo, padrao, substituicoes)
+
         # Processa tabelas no cabeçalho
         for tabela in section.header.tables:
-            processar_tabela(tabela, substituicoes)
-    
+            processar_tabela(tabela, padrao, substituicoes)
+
     # Processa rodapé
-    if section.footer:
+    if section.footer and _contem_placeholder(section.footer._element):
         for paragrafo in section.footer.paragraphs:
-            substituir_em_paragrafo(paragrafo, substituicoes)
-        
+            substituir_em_paragrafo(paragrafo, padrao, substituicoes)
+
         # Processa tabelas no rodapé
         for tabela in section.footer.tables:
-            processar_tabela(tabela, substituicoes)
+            processar_tabela(tabela, padrao, substituicoes)
 
 
-def processar_xpath_fallback(document: Document, substituicoes: Dict[str, str]) -> None:
+def processar_xpath_fallback(
+    document: Document, padrao: re.Pattern, substituicoes: Dict[str, str]
+) -> None:
     """
     Usa XPath como fallback para pegar elementos que não foram
     capturados pelas abordagens anteriores (ex: caixas de texto).
     """
     try:
-        for element in document._element.xpath('.//w:t'):
+        for element in document.element.iter(_W_T):
             texto_original = element.text or ''
-            texto_novo = texto_original
-            
-            for placeholder, valor in substituicoes.items():
-                if placeholder in texto_novo:
-                    texto_novo = texto_novo.replace(placeholder, str(valor))
-            
+
+            # Mesmo pré-filtro barato do parágrafo: só paga a regex nos
+            # nós que realmente contêm um possível placeholder
+            if "{{" not in texto_original:
+                continue
+
+            texto_novo = padrao.sub(
+                lambda m: substituicoes[m.group(0)], texto_original
+            )
+
             if texto_novo != texto_original:
                 element.text = texto_novo
     except Exception as e:
@@ -123,7 +191,7 @@ def processar_xpath_fallback(document: Document, substituicoes: Dict[str, str])
 
 def preencher_e_gerar_docx(
     dados: Dict[str, Any], caminho_template: str = Config.TEMPLATE_DOCX_PATH
-) -> Optional[BytesIO]:
+) -> Optional[bytes]:
     """
     Preenche o template .docx com os dados da correção.
     
@@ -136,7 +204,10 @@ def preencher_e_gerar_docx(
     """
     try:
         logger.info(f"📄 Abrindo template: {caminho_template}")
-        document = Document(caminho_template)
+        info = os.stat(caminho_template)
+        document = Document(
+            BytesIO(_carregar_template_bytes(caminho_template, info.st_mtime_ns))
+        )
         comps = dados.get("analise_competencias", {})
 
         # 1. Prepara o Dicionário de Substituição
@@ -151,52 +222,63 @@ def preencher_e_gerar_docx(
         }
 
         # Adiciona notas e análises das competências
-        for i in range(1, 6):
-            comp_data = comps.get(f"c{i}", {})
+        for chave, ph_nota, ph_analise in _CAMPOS_COMPETENCIAS:
+            comp_data = comps.get(chave, {})
             nota = str(comp_data.get("nota", 0))
             analise = comp_data.get("analise", "Análise não disponível.")
-            
-            # Remove markdown da análise
+
+            # Remove markdown da análise (uma única vez por competência)
             analise_limpa = analise.replace("**", "").replace("#", "").strip()
-            
-            substituicoes[f"{{{{NOTA_C{i}}}}}"] = nota
-            substituicoes[f"{{{{ANALISE_C{i}}}}}"] = analise_limpa
+
+            substituicoes[ph_nota] = nota
+            substituicoes[ph_analise] = analise_limpa
+
+        # Garante valores já convertidos para str uma única vez, em vez de
+        # chamar str() a cada substituição nos laços quentes
+        substituicoes = {k: str(v) for k, v in substituicoes.items()}
 
         logger.info("🔄 Iniciando substituições...")
         logger.info(f"   Total de placeholders: {len(substituicoes)}")
 
+        # Alternação de todas as chaves compilada uma vez por relatório:
+        # cada texto é varrido em um único passe da regex. Chaves mais
+        # longas primeiro: a alternação do re casa da esquerda para a
+        # direita (não o match mais longo), então prefixos sobrepostos
+        # exigem essa ordem.
+        chaves = sorted(substituicoes, key=len, reverse=True)
+        padrao = re.compile("|".join(map(re.escape, chaves)))
+
         # 2. Processa o CORPO do documento
         logger.info("   📝 Processando corpo do documento...")
         for paragrafo in document.paragraphs:
-            substituir_em_paragrafo(paragrafo, substituicoes)
+            substituir_em_paragrafo(paragrafo, padrao, substituicoes)
 
         # 3. Processa TABELAS no corpo
         logger.info("   📊 Processando tabelas no corpo...")
         for tabela in document.tables:
-            processar_tabela(tabela, substituicoes)
+            processar_tabela(tabela, padrao, substituicoes)
 
         # 4. Processa CABEÇALHOS e RODAPÉS de todas as seções
         logger.info("   📋 Processando cabeçalhos e rodapés...")
         for i, section in enumerate(document.sections):
-            processar_secao(section, substituicoes)
+            processar_secao(section, padrao, substituicoes)
 
         # 5. XPath como FALLBACK (caixas de texto, elementos especiais)
         logger.info("   🔍 Processando elementos especiais (XPath)...")
-        processar_xpath_fallback(document, substituicoes)
+        processar_xpath_fallback(document, padrao, substituicoes)
 
-        # 6. Salva o documento
+        # 6. Salva o documento em memória e devolve apenas os bytes, sem
+        # seek/read intermediários
         buffer = BytesIO()
         document.save(buffer)
-        buffer.seek(0)
-        
+
         logger.info(f"✅ Relatório gerado com sucesso para: {dados.get('nome_aluno')}")
-        return buffer
+        return buffer.getvalue()
 
     except FileNotFoundError:
         logger.critical(f"❌ Template não encontrado: {caminho_template}")
         return None
     except Exception as e:
         logger.error(f"❌ Erro ao gerar DOCX: {e}")
-        import traceback
         logger.error(traceback.format_exc())
         return None
\ No newline at end of file
